@@ -2,4 +2,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; the SSE stream is served outside the
+# Django request cycle so idle connections never hold a worker thread.
+from social.sse import STREAM_PATH, stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == STREAM_PATH:
+        return await stream(scope, receive, send)
+    return await django_application(scope, receive, send)
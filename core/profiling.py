@@ -0,0 +1,287 @@
+"""Opt-in per-request profiling.
+
+A request is profiled when
+
+* it carries ``X-Profile: 1`` (or ``?_profile=1``) and a JWT for a staff
+  user, checked before profiling starts; the flag is ignored for everyone
+  else (``X-Profile: explain`` also runs EXPLAIN for each SELECT), or
+* it is sampled at ``PROFILING_SAMPLE_RATE``, or at the rate written into
+  ``PROFILING_TOGGLE_FILE`` so sampling can be switched on at runtime
+  (``echo 0.05 > profiles/ENABLED``; delete the file to stop).
+
+Profiled requests run under cProfile with every SQL statement timed, and the
+time spent in top-level serializer ``to_representation`` calls is tracked
+separately. The breakdown goes into a report directory under
+``PROFILING_REPORT_DIR`` (``report.html``, ``report.json``, ``stats.txt`` and
+a ``profile.prof`` for snakeviz/pstats); only the newest
+``PROFILING_MAX_REPORTS`` are kept. Staff opt-in responses also carry it as a
+``Server-Timing`` header plus the report id in ``X-Profile-Report``; sampled
+responses carry neither. SQL parameters are recorded only for
+SELECTs in staff opt-in requests, so sampled reports never contain user data
+such as password hashes. Unprofiled requests only pay for a header lookup and
+a cached flag check.
+"""
+
+import contextvars
+import cProfile
+import html
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import shutil
+import time
+import uuid
+from contextlib import ExitStack, contextmanager, nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("profiling_current", default=None)
+_toggle = {"checked": 0.0, "rate": 0.0}
+
+
+class RequestProfile:
+    def __init__(self, explain: bool, keep_params: bool):
+        self.explain = explain
+        self.keep_params = keep_params
+        self.queries = []
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_db_time = 0.0
+        self.serializer_depth = 0
+        self.profiler = None
+
+    def start(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (e.g. a concurrent request on 3.12+);
+            # keep the SQL and timing capture without the call graph.
+            return
+        self.profiler = profiler
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def execute_wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                self.db_time += duration
+                if self.serializer_depth:
+                    self.serializer_db_time += duration
+                keep = self.keep_params and not many and _is_select(sql)
+                self.queries.append(
+                    {
+                        "alias": alias,
+                        "sql": sql,
+                        "params": params if keep else None,
+                        "many": many,
+                        "ms": round(duration * 1000, 3),
+                    }
+                )
+
+        return wrapper
+
+    def run_explains(self):
+        for query in self.queries:
+            if query["many"] or not _is_select(query["sql"]):
+                continue
+            connection = connections[query["alias"]]
+            prefix = connection.ops.explain_query_prefix()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{prefix} {query['sql']}", query["params"])
+                    rows = cursor.fetchall()
+                query["explain"] = [" ".join(str(col) for col in row) for row in rows]
+            except Exception as exc:  # EXPLAIN is best effort
+                query["explain"] = [f"EXPLAIN failed: {exc}"]
+
+
+def _is_select(sql: str) -> bool:
+    return sql.lstrip().upper().startswith("SELECT")
+
+
+@contextmanager
+def _serializer_span(profile):
+    profile.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer_depth -= 1
+        if not profile.serializer_depth:
+            profile.serializer_time += time.perf_counter() - start
+
+
+def serializer_timer():
+    """Context manager timing serialization for the active profile, if any."""
+    profile = _current.get()
+    if profile is None:
+        return nullcontext()
+    return _serializer_span(profile)
+
+
+def _toggle_rate() -> float:
+    now = time.monotonic()
+    if now - _toggle["checked"] >= 1.0:
+        _toggle["checked"] = now
+        try:
+            raw = Path(settings.PROFILING_TOGGLE_FILE).read_text()
+            _toggle["rate"] = float(raw)
+        except (OSError, ValueError):
+            _toggle["rate"] = 0.0
+    return _toggle["rate"]
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+
+
+def _is_staff_request(request) -> bool:
+    """Authenticate the bearer token early; the flag is only honoured for staff."""
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def _prune_reports(directory: Path, keep: int) -> None:
+    reports = [path for path in directory.iterdir() if path.is_dir()]
+    if len(reports) <= keep:
+        return
+    reports.sort(key=lambda path: path.stat().st_mtime)
+    for path in reports[: len(reports) - keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        flag = request.headers.get("X-Profile") or request.GET.get("_profile")
+        opted_in = flag not in (None, "", "0") and _is_staff_request(request)
+        rate = max(settings.PROFILING_SAMPLE_RATE, _toggle_rate())
+        sampled = not opted_in and rate > 0 and random.random() < rate
+        if not (opted_in or sampled):
+            return self.get_response(request)
+
+        profile = RequestProfile(
+            explain=opted_in and flag == "explain", keep_params=opted_in
+        )
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(
+                            profile.execute_wrapper(alias)
+                        )
+                    )
+                profile.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profile.stop()
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        if profile.explain:
+            profile.run_explains()
+        # Timings and report ids are for staff only; sampled requests come from
+        # arbitrary clients and only leave a report on disk.
+        if opted_in:
+            response["Server-Timing"] = self.server_timing(profile, total)
+        try:
+            report_id = self.write_report(request, response, profile, total)
+        except OSError:
+            logger.exception("Could not write profiling report")
+        else:
+            if opted_in:
+                response["X-Profile-Report"] = report_id
+        return response
+
+    @staticmethod
+    def server_timing(profile, total) -> str:
+        serializer = profile.serializer_time - profile.serializer_db_time
+        app = max(total - profile.db_time - serializer, 0.0)
+        queries = len(profile.queries)
+        return ", ".join(
+            [
+                f'db;dur={profile.db_time * 1000:.1f};desc="{queries} queries"',
+                f"serializer;dur={serializer * 1000:.1f}",
+                f"app;dur={app * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+
+    def write_report(self, request, response, profile, total) -> str:
+        report_id = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-"
+            f"{_slug(request.path)}-{uuid.uuid4().hex[:6]}"
+        )
+        directory = Path(settings.PROFILING_REPORT_DIR) / report_id
+        os.makedirs(directory, exist_ok=True)
+        buf = io.StringIO()
+        if profile.profiler is not None:
+            profile.profiler.dump_stats(directory / "profile.prof")
+            stats = pstats.Stats(profile.profiler, stream=buf)
+            stats.sort_stats("cumulative").print_stats(50)
+            (directory / "stats.txt").write_text(buf.getvalue())
+
+        summary = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "user": getattr(getattr(request, "user", None), "pk", None),
+            "total_ms": round(total * 1000, 3),
+            "db_ms": round(profile.db_time * 1000, 3),
+            "serializer_ms": round(profile.serializer_time * 1000, 3),
+            "serializer_db_ms": round(profile.serializer_db_time * 1000, 3),
+            "queries": profile.queries,
+        }
+        report = json.dumps(summary, indent=2, default=str)
+        (directory / "report.json").write_text(report)
+        html_report = self.render_html(summary, buf.getvalue())
+        (directory / "report.html").write_text(html_report)
+        _prune_reports(directory.parent, settings.PROFILING_MAX_REPORTS)
+        return report_id
+
+    @staticmethod
+    def render_html(summary, stats_text) -> str:
+        rows = []
+        for i, query in enumerate(summary["queries"], 1):
+            explain = "\n".join(query.get("explain", []))
+            rows.append(
+                f"<tr><td>{i}</td><td>{query['ms']}</td>"
+                f"<td><pre>{html.escape(query['sql'])}</pre>"
+                f"<pre>{html.escape(explain)}</pre></td></tr>"
+            )
+        title = html.escape(f"{summary['method']} {summary['path']}")
+        return (
+            f"<!doctype html><title>{title}</title><h1>{title}</h1>"
+            f"<p>status {summary['status']} &middot; total {summary['total_ms']} ms"
+            f" &middot; db {summary['db_ms']} ms ({len(summary['queries'])} queries)"
+            f" &middot; serializer {summary['serializer_ms']} ms</p>"
+            f"<h2>SQL</h2><table border=1 cellpadding=4>"
+            f"<tr><th>#</th><th>ms</th><th>statement</th></tr>{''.join(rows)}</table>"
+            f"<h2>Profile</h2><pre>{html.escape(stats_text)}</pre>"
+        )
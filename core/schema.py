@@ -0,0 +1,137 @@
+"""Precomputed OpenAPI schema.
+
+``manage.py build_schema`` renders the schema once per format (JSON and
+YAML) and stores each file next to a SHA-256 of its bytes. ``/api/schema/``
+then serves the stored file with the hash as its ETag instead of walking
+every viewset and serializer per request. The format is negotiated exactly
+like drf-spectacular's own view (``?format=`` or ``Accept``, YAML by
+default). In DEBUG the schema is generated live so local changes show up
+immediately.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseNotFound,
+    HttpResponseNotModified,
+)
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+
+logger = logging.getLogger(__name__)
+
+RENDERERS = SpectacularAPIView.renderer_classes
+FORMATS = ("json", "yaml")
+
+_live_view = SpectacularAPIView.as_view()
+_cache = {}
+
+
+def _renderer(fmt):
+    return next(renderer for renderer in RENDERERS if renderer.format == fmt)()
+
+
+def generate_schema(fmt="json") -> bytes:
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return _renderer(fmt).render(schema, renderer_context={})
+
+
+def schema_path(fmt="json", base=None) -> Path:
+    """Stored file for ``fmt``: ``OPENAPI_SCHEMA_FILE`` with the format suffix."""
+    return Path(base or settings.OPENAPI_SCHEMA_FILE).with_suffix(f".{fmt}")
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def hash_path(schema_path) -> str:
+    return f"{schema_path}.sha256"
+
+
+def write_schema(body: bytes, schema_path) -> str:
+    digest = content_hash(body)
+    with open(schema_path, "wb") as fh:
+        fh.write(body)
+    with open(hash_path(schema_path), "w") as fh:
+        fh.write(digest + "\n")
+    return digest
+
+
+def load_stored_schema(schema_path):
+    """Return ``(body, digest)`` for the stored schema, or ``None`` if absent.
+
+    Cached per file modification time, so a rebuilt file is picked up without
+    a restart while unchanged files are read only once.
+    """
+    try:
+        mtime = os.stat(schema_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _cache.get(schema_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(schema_path, "rb") as fh:
+        body = fh.read()
+    try:
+        with open(hash_path(schema_path)) as fh:
+            digest = fh.read().strip()
+    except FileNotFoundError:
+        digest = ""
+    if digest != content_hash(body):
+        logger.warning("Stored OpenAPI schema hash mismatch; rehashing %s", schema_path)
+        digest = content_hash(body)
+    _cache[schema_path] = (mtime, (body, digest))
+    return body, digest
+
+
+def negotiate(request):
+    """Return ``(renderer, content_type)`` as the live schema view would."""
+    renderers = [renderer() for renderer in RENDERERS]
+    renderer, _ = DefaultContentNegotiation().select_renderer(
+        Request(request), renderers
+    )
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    return renderer, content_type
+
+
+def schema_view(request):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    if settings.DEBUG:
+        return _live_view(request)
+    try:
+        renderer, content_type = negotiate(request)
+    except Http404:
+        return HttpResponseNotFound()
+    except NotAcceptable:
+        return HttpResponse(status=406)
+    stored = load_stored_schema(schema_path(renderer.format))
+    if stored is None:
+        logger.warning("No stored OpenAPI schema; run `manage.py build_schema`.")
+        return _live_view(request)
+
+    body, digest = stored
+    etag = f'"{digest}"'
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    response["ETag"] = etag
+    response["Vary"] = "Accept"
+    response["Cache-Control"] = "public, max-age=300"
+    return response
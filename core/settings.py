@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # CORS first so it adds headers
     "corsheaders.middleware.CorsMiddleware",
+    # Opt-in profiling; wraps everything below it
+    "core.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     # WhiteNoise for static files in production
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -143,6 +145,52 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
+# Notifications: events on the same target are coalesced per time bucket.
+NOTIFICATION_BUCKET_SECONDS = int(os.getenv("NOTIFICATION_BUCKET_SECONDS", "21600"))
+# Distinct actors tracked per group; beyond this the summary says "N+ others".
+NOTIFICATION_MAX_ACTORS = int(os.getenv("NOTIFICATION_MAX_ACTORS", "10"))
+
+# Maximum sub-requests accepted by /api/batch/
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10"))
+
+# Like counters: buffer per-post deltas in memory and flush them in batches
+# instead of updating the post row on every like (see social/counters.py).
+LIKE_COUNTER_BUFFERED = os.getenv("LIKE_COUNTER_BUFFERED", "0") == "1"
+LIKE_COUNTER_FLUSH_SECONDS = float(os.getenv("LIKE_COUNTER_FLUSH_SECONDS", "2"))
+LIKE_COUNTER_FLUSH_THRESHOLD = int(os.getenv("LIKE_COUNTER_FLUSH_THRESHOLD", "1000"))
+
+# Server-Sent Events (ASGI only, see core/asgi.py)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_CONNECTIONS_PER_USER = int(os.getenv("SSE_MAX_CONNECTIONS_PER_USER", "3"))
+SSE_MAX_POST_SUBSCRIPTIONS = int(os.getenv("SSE_MAX_POST_SUBSCRIPTIONS", "50"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+# Dotted path to a social.events.Broker subclass for multi-worker fan-out,
+# e.g. "social.events.RedisBroker" (needs the redis package).
+SSE_BROKER = os.getenv("SSE_BROKER", "")
+SSE_REDIS_URL = os.getenv("SSE_REDIS_URL", "redis://localhost:6379/0")
+
+# Profiling (see core/profiling.py). Staff can opt in per request with
+# `X-Profile: 1`; sampling can also be enabled at runtime via the toggle file.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_REPORT_DIR = Path(os.getenv("PROFILING_REPORT_DIR", BASE_DIR / "profiles"))
+PROFILING_TOGGLE_FILE = PROFILING_REPORT_DIR / "ENABLED"
+# Older report directories beyond this count are deleted
+PROFILING_MAX_REPORTS = int(os.getenv("PROFILING_MAX_REPORTS", "200"))
+
+# Posts older than this are moved to cold storage by `manage.py archive_posts`
+ARCHIVE_POSTS_AFTER_DAYS = int(os.getenv("ARCHIVE_POSTS_AFTER_DAYS", "365"))
+
+# Batched deletion of users/posts (`social.deletion`, `manage.py process_deletions`)
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "1000"))
+# Batches run inside the DELETE request before handing off to the command
+DELETION_INLINE_BATCHES = int(os.getenv("DELETION_INLINE_BATCHES", "3"))
+# A running job untouched for this long is assumed crashed and may be resumed
+DELETION_STALE_SECONDS = int(os.getenv("DELETION_STALE_SECONDS", "300"))
+
+# Prebuilt OpenAPI schema served at /api/schema/ (`manage.py build_schema`);
+# the YAML rendering is stored next to it as openapi.yaml
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi.json"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -1,19 +1,25 @@
 from django.contrib import admin
-from .models import Post, Comment, Like, Follow
+from .models import (
+    ArchivedPost,
+    Comment,
+    DeletionJob,
+    Follow,
+    Like,
+    Notification,
+    NotificationCounter,
+    Post,
+)
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("id", "author", "short_body", "created_at", "likes_count")
+    list_display = ("id", "author", "short_body", "created_at", "likes_total")
     search_fields = ("body", "author__username")
     list_select_related = ("author",)
 
     def short_body(self, obj):
         return (obj.body[:50] + "...") if len(obj.body) > 50 else obj.body
 
-    def likes_count(self, obj):
-        return obj.likes.count()
-
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -37,3 +43,41 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ("id", "follower", "following", "created_at")
     list_select_related = ("follower", "following")
     search_fields = ("follower__username", "following__username")
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ("id", "recipient", "verb", "post_id", "event_count", "updated_at")
+    list_select_related = ("recipient",)
+    list_filter = ("verb",)
+    search_fields = ("recipient__username",)
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ("user", "unread", "last_read_at")
+    list_select_related = ("user",)
+    search_fields = ("user__username",)
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ("id", "author", "created_at", "archived_at")
+    list_select_related = ("author",)
+    search_fields = ("author__username",)
+    exclude = ("payload",)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "target_id",
+        "status",
+        "step",
+        "rows_deleted",
+        "updated_at",
+    )
+    list_filter = ("kind", "status")
+    search_fields = ("target_id",)
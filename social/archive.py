@@ -0,0 +1,158 @@
+"""Cold archival of old posts.
+
+``archive_posts`` moves posts older than a cutoff, together with their
+comments, into ``ArchivedPost`` rows holding a compressed JSON snapshot, and
+deletes them from the hot tables in bounded batches. Optionally each batch is
+also appended to gzip NDJSON files (one per month) for offline storage.
+``PostViewSet.retrieve`` and ``CommentViewSet`` fall back to
+``load_archived_post`` so archived posts and their comments stay readable by
+id, one extra lookup slower. Snapshots are rendered with the live
+serializers; authors are re-rendered on read so their follower counts are
+current and deleted accounts drop out.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ArchivedPost, Comment, Post
+from .serializers import CommentSerializer, PostSerializer, UserPublicSerializer
+
+User = get_user_model()
+
+
+def _encode(payload: dict) -> bytes:
+    return zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder).encode())
+
+
+def _decode(blob) -> dict:
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def snapshot_posts(posts) -> list:
+    """Build archive payloads with ``PostSerializer``/``CommentSerializer``."""
+    comments = defaultdict(list)
+    rows = (
+        Comment.objects.filter(post__in=[p.id for p in posts])
+        .select_related("author")
+        .order_by("created_at", "id")
+    )
+    for comment in rows:
+        comments[comment.post_id].append(comment)
+    payloads = []
+    for post in posts:
+        post.comments_count = len(comments[post.id])
+        payload = dict(PostSerializer(post).data)
+        payload["archived"] = True
+        payload["comments"] = CommentSerializer(comments[post.id], many=True).data
+        payloads.append(payload)
+    return payloads
+
+
+def archive_batch(cutoff, batch_size: int, export_dir=None) -> int:
+    """Archive up to ``batch_size`` of the oldest posts before ``cutoff``.
+
+    The posts are locked before the snapshot is taken, so a comment or like
+    added concurrently either makes it into the snapshot or fails its foreign
+    key check once the post is gone; it is never deleted unarchived.
+    """
+    with transaction.atomic():
+        posts = list(
+            # Hidden posts are being deleted; archiving would resurrect them.
+            Post.objects.filter(
+                created_at__lt=cutoff, is_hidden=False, author__is_active=True
+            )
+            .select_related("author")
+            .select_for_update(of=("self",))
+            .order_by("created_at", "id")[:batch_size]
+        )
+        if not posts:
+            return 0
+        payloads = snapshot_posts(posts)
+        ArchivedPost.objects.bulk_create(
+            [
+                ArchivedPost(
+                    id=post.id,
+                    author_id=post.author_id,
+                    created_at=post.created_at,
+                    payload=_encode(payload),
+                )
+                for post, payload in zip(posts, payloads)
+            ],
+            ignore_conflicts=True,
+        )
+        Post.objects.filter(id__in=[p.id for p in posts]).delete()
+    if export_dir:
+        export_ndjson(payloads, export_dir)
+    return len(posts)
+
+
+def archive_posts(cutoff, batch_size: int = 500, export_dir=None) -> int:
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size, export_dir)
+        if not moved:
+            return total
+        total += moved
+
+
+def export_ndjson(payloads, export_dir) -> None:
+    """Append payloads to ``posts-YYYY-MM.ndjson.gz`` files (multi-member gzip)."""
+    os.makedirs(export_dir, exist_ok=True)
+    by_month = defaultdict(list)
+    for payload in payloads:
+        by_month[payload["created_at"][:7]].append(payload)
+    for month, items in by_month.items():
+        path = Path(export_dir) / f"posts-{month}.ndjson.gz"
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            for item in items:
+                fh.write(json.dumps(item, cls=DjangoJSONEncoder) + "\n")
+
+
+def _render_authors(payload: dict, with_comments: bool) -> dict:
+    comments = payload.get("comments", []) if with_comments else []
+    ids = {payload["author"]["id"]} | {c["author"]["id"] for c in comments}
+    users = User.objects.filter(pk__in=ids, is_active=True).annotate(
+        followers_count=Count("followers", distinct=True),
+        following_count=Count("following", distinct=True),
+    )
+    authors = {user.id: UserPublicSerializer(user).data for user in users}
+    payload["author"] = authors.get(payload["author"]["id"], payload["author"])
+    if with_comments:
+        payload["comments"] = [
+            {
+                "id": comment["id"],
+                "author": authors[comment["author"]["id"]],
+                "post": payload["id"],
+                "body": comment["body"],
+                "created_at": comment["created_at"],
+                "updated_at": comment["updated_at"],
+            }
+            for comment in comments
+            if comment["author"]["id"] in authors
+        ]
+    return payload
+
+
+def load_archived_post(post_id, with_comments: bool = False):
+    """Return the archived post as API data, or ``None`` if it was never archived.
+
+    Shaped like ``PostSerializer`` output plus ``"archived": true``; with
+    ``with_comments`` it also carries ``CommentSerializer``-shaped comments.
+    """
+    archived = ArchivedPost.objects.filter(pk=post_id, author__is_active=True)
+    blob = archived.values_list("payload", flat=True).first()
+    if blob is None:
+        return None
+    payload = _decode(blob)
+    if not with_comments:
+        payload.pop("comments", None)
+    return _render_authors(payload, with_comments)
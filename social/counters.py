@@ -0,0 +1,172 @@
+"""Like counters stored on ``Post.likes_total``.
+
+By default every like/unlike applies its delta to the post row inside the
+request (``F("likes_total") + 1``). On a viral post that single row becomes a
+lock-contention hotspot, so ``LIKE_COUNTER_BUFFERED`` switches to a write
+buffer: deltas are summed per post in process memory once the request's
+transaction commits, and a background thread flushes them in one short
+transaction every ``LIKE_COUNTER_FLUSH_SECONDS`` (or as soon as
+``LIKE_COUNTER_FLUSH_THRESHOLD`` events are pending). Requests never write
+the post row themselves. Reads add this process's pending deltas to the
+persisted value.
+
+Buffered deltas are lost if a worker dies before flushing; run the
+``sync_like_counts`` command to recompute totals from the ``Like`` table.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Like, Post
+
+logger = logging.getLogger(__name__)
+
+
+class LikeCounterBuffer:
+    def __init__(self, flush_seconds: float, flush_threshold: int):
+        self.flush_seconds = flush_seconds
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        # Deltas taken out of ``_pending`` but not yet committed; still
+        # counted by reads so totals do not dip during a flush.
+        self._inflight = {}
+        self._events = 0
+        self._flusher = None
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+
+    def add(self, post_id: int, delta: int) -> None:
+        with self._lock:
+            self._pending[post_id] += delta
+            self._events += 1
+            full = self._events >= self.flush_threshold
+            if self._flusher is None and not self._stopped.is_set():
+                self._start_flusher()
+        if full:
+            # Flush early, but on the flusher thread: the caller must not end
+            # up holding the hot-row locks.
+            self._wake.set()
+
+    def pending(self, post_id: int) -> int:
+        with self._lock:
+            return self._pending.get(post_id, 0) + self._inflight.get(post_id, 0)
+
+    def flush(self) -> int:
+        """Write pending deltas to the database; returns the number of posts."""
+        with self._flush_lock:
+            with self._lock:
+                batch = {pid: d for pid, d in self._pending.items() if d}
+                self._pending.clear()
+                self._events = 0
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    # Sorted ids give concurrent flushers a consistent lock order.
+                    for post_id in sorted(batch):
+                        Post.objects.filter(pk=post_id).update(
+                            likes_total=F("likes_total") + batch[post_id]
+                        )
+            except Exception:
+                logger.exception("Flushing buffered like counts failed")
+                with self._lock:
+                    for post_id, delta in batch.items():
+                        self._pending[post_id] += delta
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self._inflight = {}
+            return len(batch)
+
+    def _start_flusher(self):
+        self._flusher = threading.Thread(
+            target=self._run, name="like-counter-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """Stop the flusher thread, then optionally write what is pending."""
+        self._stopped.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; deltas are retried on the next tick
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> LikeCounterBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LikeCounterBuffer(
+                    settings.LIKE_COUNTER_FLUSH_SECONDS,
+                    settings.LIKE_COUNTER_FLUSH_THRESHOLD,
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def reset_buffer(flush: bool = True) -> None:
+    """Stop and drop this process's buffer; the next write starts a fresh one."""
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        atexit.unregister(buffer.flush)
+        buffer.stop(flush=flush)
+
+
+def apply_like_delta(post_id: int, delta: int) -> None:
+    if settings.LIKE_COUNTER_BUFFERED:
+        # Only count likes that committed; a rolled-back request adds nothing.
+        transaction.on_commit(lambda: get_buffer().add(post_id, delta))
+    else:
+        Post.objects.filter(pk=post_id).update(likes_total=F("likes_total") + delta)
+
+
+def likes_count(post) -> int:
+    """Persisted total plus deltas still buffered in this process."""
+    if _buffer is None:
+        return post.likes_total
+    return post.likes_total + _buffer.pending(post.id)
+
+
+def recount_likes(queryset=None) -> int:
+    """Recompute ``likes_total`` from the ``Like`` table in one UPDATE."""
+    counts = (
+        Like.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.update(likes_total=Coalesce(Subquery(counts), 0))
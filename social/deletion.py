@@ -0,0 +1,382 @@
+"""Chunked, resumable deletion of users and posts.
+
+Deleting through the ORM makes Django's collector load every related
+like, comment, follow and notification into memory and remove them in one
+long transaction. Instead, a deletion request hides the target right away
+(``is_active=False`` for users, ``is_hidden=True`` for posts) and records a
+``DeletionJob``. The job then removes dependent rows step by step with
+bounded raw-SQL batches (``DELETE ... WHERE id IN (SELECT id ... LIMIT n)``).
+Each batch commits together with the job's progress, so a crashed worker
+resumes where it stopped. Derived counters (like totals, notification
+actor counts, recipients' unread totals) are adjusted per batch with one
+aggregated UPDATE. The final ORM delete of the user or post row then finds
+nothing left to collect.
+
+A few batches run inline in the request (``DELETION_INLINE_BATCHES``); the
+rest is picked up by ``manage.py process_deletions``.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    ArchivedPost,
+    Comment,
+    DeletionJob,
+    Follow,
+    Like,
+    Notification,
+    NotificationActor,
+    NotificationCounter,
+    Post,
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _table(model):
+    return _qn(model._meta.db_table)
+
+
+def _delete_where(model, where, params, limit):
+    """Delete up to ``limit`` rows of ``model`` matching ``where``."""
+    table = _table(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE id IN "
+            f"(SELECT id FROM {table} WHERE {where} LIMIT %s)",
+            [*params, limit],
+        )
+        return cursor.rowcount
+
+
+def _user_posts(user_id):
+    return f"(SELECT id FROM {_table(Post)} WHERE author_id = %s)", [user_id]
+
+
+# Steps return the number of rows they touched; 0 means the step is finished.
+
+
+def _delete_decrementing(
+    model, user_column, parent_column, parent, counter, user_id, limit
+):
+    """Delete a batch of the user's ``model`` rows and decrement ``counter``.
+
+    The rows are unique per (user, parent), so each parent loses exactly one.
+    Returns the ids of the parents that were decremented.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, {parent_column} FROM {_table(model)} "
+            f"WHERE {user_column} = %s LIMIT %s",
+            [user_id, limit],
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return []
+    ids = [row[0] for row in rows]
+    parent_ids = sorted({row[1] for row in rows})
+    id_marks = ", ".join(["%s"] * len(ids))
+    parent_marks = ", ".join(["%s"] * len(parent_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {_table(model)} WHERE id IN ({id_marks})", ids)
+        cursor.execute(
+            f"UPDATE {_table(parent)} SET {counter} = {counter} - 1 "
+            f"WHERE id IN ({parent_marks})",
+            parent_ids,
+        )
+    return parent_ids
+
+
+def _delete_notifications(where, params, limit):
+    """Delete a batch of notification groups and fix their recipients' unread.
+
+    Groups updated after the recipient's read watermark were counted as
+    unread; recipients that lost the same number share one UPDATE.
+    """
+    table = _table(Notification)
+    counter = _table(NotificationCounter)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, recipient_id, EXISTS (SELECT 1 FROM {counter} c "
+            f"WHERE c.user_id = recipient_id AND "
+            f"(c.last_read_at IS NULL OR c.last_read_at < updated_at)) "
+            f"FROM {table} WHERE {where} LIMIT %s",
+            [*params, limit],
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return 0
+    unread = Counter(recipient_id for _, recipient_id, is_unread in rows if is_unread)
+    by_amount = defaultdict(list)
+    for recipient_id, amount in unread.items():
+        by_amount[amount].append(recipient_id)
+    ids = [row[0] for row in rows]
+    id_marks = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({id_marks})", ids)
+        for amount, recipient_ids in by_amount.items():
+            marks = ", ".join(["%s"] * len(recipient_ids))
+            cursor.execute(
+                f"UPDATE {counter} SET unread = CASE "
+                f"WHEN unread > %s THEN unread - %s ELSE 0 END "
+                f"WHERE user_id IN ({marks})",
+                [amount, amount, *recipient_ids],
+            )
+    return len(ids)
+
+
+def _likes_by_user(user_id, limit):
+    """Remove the user's likes and decrement the liked posts' totals."""
+    post_ids = _delete_decrementing(
+        Like, "user_id", "post_id", Post, "likes_total", user_id, limit
+    )
+    return len(post_ids)
+
+
+def _likes_on_user_posts(user_id, limit):
+    sub, params = _user_posts(user_id)
+    return _delete_where(Like, f"post_id IN {sub}", params, limit)
+
+
+def _comments_by_user(user_id, limit):
+    return _delete_where(Comment, "author_id = %s", [user_id], limit)
+
+
+def _comments_on_user_posts(user_id, limit):
+    sub, params = _user_posts(user_id)
+    return _delete_where(Comment, f"post_id IN {sub}", params, limit)
+
+
+def _notification_actors_for_user(user_id, limit):
+    sub, params = _user_posts(user_id)
+    groups = (
+        f"(SELECT id FROM {_table(Notification)} "
+        f"WHERE recipient_id = %s OR post_id IN {sub})"
+    )
+    return _delete_where(
+        NotificationActor, f"notification_id IN {groups}", [user_id, *params], limit
+    )
+
+
+def _notifications_for_user(user_id, limit):
+    sub, params = _user_posts(user_id)
+    where = f"recipient_id = %s OR post_id IN {sub}"
+    return _delete_notifications(where, [user_id, *params], limit)
+
+
+def _notification_actors_by_user(user_id, limit):
+    """Forget the user as an actor so "N others" no longer counts them.
+
+    Groups the user was the only actor of have nothing left to show and go.
+    """
+    notification_ids = _delete_decrementing(
+        NotificationActor,
+        "actor_id",
+        "notification_id",
+        Notification,
+        "actor_count",
+        user_id,
+        limit,
+    )
+    if notification_ids:
+        marks = ", ".join(["%s"] * len(notification_ids))
+        _delete_notifications(
+            f"actor_count = 0 AND id IN ({marks})",
+            notification_ids,
+            len(notification_ids),
+        )
+    return len(notification_ids)
+
+
+def _notifications_by_actor(user_id, limit):
+    table = _table(Notification)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET last_actor_id = NULL WHERE id IN "
+            f"(SELECT id FROM {table} WHERE last_actor_id = %s LIMIT %s)",
+            [user_id, limit],
+        )
+        return cursor.rowcount
+
+
+def _follows(user_id, limit):
+    return _delete_where(
+        Follow, "follower_id = %s OR following_id = %s", [user_id, user_id], limit
+    )
+
+
+def _archived_posts(user_id, limit):
+    return _delete_where(ArchivedPost, "author_id = %s", [user_id], limit)
+
+
+def _posts_by_user(user_id, limit):
+    return _delete_where(Post, "author_id = %s", [user_id], limit)
+
+
+def _user_row(user_id, limit):
+    NotificationCounter.objects.filter(user_id=user_id).delete()
+    # Everything heavy is gone; the collector only sees auth bookkeeping now.
+    deleted, _ = User.objects.filter(pk=user_id).delete()
+    return 0 if not deleted else -deleted
+
+
+def _likes_on_post(post_id, limit):
+    return _delete_where(Like, "post_id = %s", [post_id], limit)
+
+
+def _comments_on_post(post_id, limit):
+    return _delete_where(Comment, "post_id = %s", [post_id], limit)
+
+
+def _notification_actors_on_post(post_id, limit):
+    groups = f"(SELECT id FROM {_table(Notification)} WHERE post_id = %s)"
+    return _delete_where(
+        NotificationActor, f"notification_id IN {groups}", [post_id], limit
+    )
+
+
+def _notifications_on_post(post_id, limit):
+    return _delete_notifications("post_id = %s", [post_id], limit)
+
+
+def _archived_post(post_id, limit):
+    return _delete_where(ArchivedPost, "id = %s", [post_id], limit)
+
+
+def _post_row(post_id, limit):
+    deleted, _ = Post.objects.filter(pk=post_id).delete()
+    return 0 if not deleted else -deleted
+
+
+# A negative count marks a terminal step: record the rows and move on.
+STEPS = {
+    DeletionJob.KIND_USER: [
+        _likes_by_user,
+        _likes_on_user_posts,
+        _comments_by_user,
+        _comments_on_user_posts,
+        _notification_actors_for_user,
+        _notifications_for_user,
+        _notification_actors_by_user,
+        _notifications_by_actor,
+        _follows,
+        _archived_posts,
+        _posts_by_user,
+        _user_row,
+    ],
+    DeletionJob.KIND_POST: [
+        _likes_on_post,
+        _comments_on_post,
+        _notification_actors_on_post,
+        _notifications_on_post,
+        _archived_post,
+        _post_row,
+    ],
+}
+
+
+def _enqueue(kind, target_id):
+    try:
+        with transaction.atomic():
+            return DeletionJob.objects.create(kind=kind, target_id=target_id)
+    except IntegrityError:
+        return DeletionJob.objects.get(kind=kind, target_id=target_id)
+
+
+def _start(kind, target_id):
+    job = _enqueue(kind, target_id)
+    try:
+        run_job(job, max_batches=settings.DELETION_INLINE_BATCHES)
+    except Exception:
+        # Already logged and recorded on the job; the target stays hidden and
+        # `process_deletions --retry-failed` picks it up.
+        pass
+    job.refresh_from_db()
+    return job
+
+
+def request_user_deletion(user) -> DeletionJob:
+    """Deactivate ``user`` (hiding their profile and content) and queue deletion."""
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    return _start(DeletionJob.KIND_USER, user.pk)
+
+
+def request_post_deletion(post) -> DeletionJob:
+    """Hide ``post`` immediately and queue deletion of it and its rows."""
+    Post.objects.filter(pk=post.pk).update(is_hidden=True)
+    return _start(DeletionJob.KIND_POST, post.pk)
+
+
+def _claim(job) -> bool:
+    stale = timezone.now() - timedelta(seconds=settings.DELETION_STALE_SECONDS)
+    claimable = Q(status=DeletionJob.STATUS_PENDING) | Q(
+        status=DeletionJob.STATUS_RUNNING, updated_at__lt=stale
+    )
+    return bool(
+        DeletionJob.objects.filter(claimable, pk=job.pk).update(
+            status=DeletionJob.STATUS_RUNNING, updated_at=timezone.now()
+        )
+    )
+
+
+def run_job(job, max_batches=None, batch_size=None) -> bool:
+    """Advance ``job`` by at most ``max_batches`` batches; True once finished."""
+    if max_batches is not None and max_batches <= 0:
+        return False
+    if not _claim(job):
+        return False
+    job.refresh_from_db()
+    steps = STEPS[job.kind]
+    limit = batch_size or settings.DELETION_BATCH_SIZE
+    batches = 0
+    try:
+        while job.step < len(steps):
+            if max_batches is not None and batches >= max_batches:
+                job.status = DeletionJob.STATUS_PENDING
+                job.save(update_fields=["status", "updated_at"])
+                return False
+            with transaction.atomic():
+                count = steps[job.step](job.target_id, limit)
+                if count <= 0:
+                    job.step += 1
+                job.rows_deleted += abs(count)
+                job.save(update_fields=["step", "rows_deleted", "updated_at"])
+            batches += 1
+    except Exception as exc:
+        logger.exception("Deletion job %s failed", job.pk)
+        job.status = DeletionJob.STATUS_FAILED
+        job.last_error = str(exc)
+        job.save(update_fields=["status", "last_error", "updated_at"])
+        raise
+    job.status = DeletionJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at", "updated_at"])
+    return True
+
+
+def process_pending(max_batches=None, batch_size=None, retry_failed=False) -> int:
+    """Run every claimable job to completion (or budget); returns jobs finished."""
+    statuses = [DeletionJob.STATUS_PENDING, DeletionJob.STATUS_RUNNING]
+    if retry_failed:
+        DeletionJob.objects.filter(status=DeletionJob.STATUS_FAILED).update(
+            status=DeletionJob.STATUS_PENDING
+        )
+    finished = 0
+    for job in DeletionJob.objects.filter(status__in=statuses).order_by("id"):
+        if run_job(job, max_batches=max_batches, batch_size=batch_size):
+            finished += 1
+    return finished
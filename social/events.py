@@ -0,0 +1,223 @@
+"""In-process pub/sub hub feeding the SSE stream.
+
+Views publish small JSON events on channels (``author:<id>`` for new posts,
+``post:<id>`` for like/comment count changes). Subscribers are asyncio queues
+owned by SSE connections; publishing is thread-safe so sync views running in
+worker threads can hand events to the event loop.
+
+With a single worker everything stays in memory. To fan out across workers set
+``SSE_BROKER`` to the dotted path of a ``Broker`` subclass: every publish then
+goes through the broker and local delivery happens when it echoes back.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """Cross-process transport for hub events."""
+
+    def publish(self, channel: str, message: dict) -> None:
+        raise NotImplementedError
+
+    def start(self, deliver) -> None:
+        """Begin delivering remote messages by calling ``deliver(channel, message)``."""
+        raise NotImplementedError
+
+
+class RedisBroker(Broker):
+    """Redis pub/sub broker (requires the optional ``redis`` package)."""
+
+    prefix = "social:sse:"
+    # Reconnect delay after a failure, doubling up to ``max_backoff``.
+    backoff = 0.5
+    max_backoff = 30.0
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise ImproperlyConfigured("RedisBroker requires redis.") from exc
+        self.client = redis.Redis.from_url(settings.SSE_REDIS_URL)
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+    def start(self, deliver):
+        threading.Thread(
+            target=self.run, args=(deliver,), name="sse-redis-broker", daemon=True
+        ).start()
+
+    def run(self, deliver, stop=None):
+        """Listen until ``stop`` is set, reconnecting with backoff on failure.
+
+        Local delivery only happens through this loop, so it must not die.
+        """
+        stop = stop or threading.Event()
+        delay = self.backoff
+        while not stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + "*")
+                delay = self.backoff
+                for item in pubsub.listen():
+                    self._dispatch(deliver, item)
+                    if stop.is_set():
+                        return
+            except Exception:
+                logger.exception("SSE broker connection lost; retrying in %.1fs", delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            if stop.wait(delay):
+                return
+            delay = min(delay * 2, self.max_backoff)
+
+    def _dispatch(self, deliver, item):
+        try:
+            channel = item["channel"].decode()[len(self.prefix) :]
+            message = json.loads(item["data"])
+        except (KeyError, AttributeError, TypeError, ValueError):
+            logger.warning("Ignoring malformed SSE broker message: %r", item)
+            return
+        deliver(channel, message)
+
+
+class Subscription:
+    """A bounded queue of events for one SSE connection.
+
+    When the consumer falls behind the queue is cleared and a single
+    ``resync`` event is queued instead, so slow clients cost bounded memory
+    and know to refetch.
+    """
+
+    def __init__(self, hub, user_id, channels, maxsize):
+        self.hub = hub
+        self.user_id = user_id
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message: dict) -> None:
+        """Enqueue from any thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "dropped": self.dropped})
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class EventHub:
+    def __init__(self, broker=None):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+        self._per_user = defaultdict(int)
+        self.broker = broker
+        if broker is not None:
+            broker.start(self.deliver)
+
+    def subscribe(self, user_id, channels) -> Subscription:
+        with self._lock:
+            if self._per_user[user_id] >= settings.SSE_MAX_CONNECTIONS_PER_USER:
+                raise TooManyConnections
+            sub = Subscription(self, user_id, channels, settings.SSE_QUEUE_SIZE)
+            self._per_user[user_id] += 1
+            for channel in sub.channels:
+                self._channels[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for channel in sub.channels:
+                subs = self._channels.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._channels[channel]
+            self._per_user[sub.user_id] -= 1
+            if self._per_user[sub.user_id] <= 0:
+                del self._per_user[sub.user_id]
+
+    def publish(self, channel: str, message: dict) -> None:
+        if self.broker is not None:
+            try:
+                self.broker.publish(channel, message)
+            except Exception:  # live updates are best effort
+                logger.exception("SSE broker publish failed")
+            return
+        self.deliver(channel, message)
+
+    def deliver(self, channel: str, message: dict) -> None:
+        with self._lock:
+            subs = list(self._channels.get(channel, ()))
+        for sub in subs:
+            sub.offer(message)
+
+    def connection_count(self, user_id) -> int:
+        return self._per_user.get(user_id, 0)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> EventHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                broker_path = settings.SSE_BROKER
+                broker = import_string(broker_path)() if broker_path else None
+                _hub = EventHub(broker)
+    return _hub
+
+
+def publish(channel: str, message: dict) -> None:
+    """Publish once the surrounding transaction (if any) commits."""
+    transaction.on_commit(lambda: get_hub().publish(channel, message))
+
+
+def post_created(post) -> None:
+    publish(
+        f"author:{post.author_id}",
+        {"type": "post.created", "post": post.id, "author": post.author_id},
+    )
+
+
+def post_counts_changed(post_id: int, likes: int = 0, comments: int = 0) -> None:
+    publish(
+        f"post:{post_id}",
+        {
+            "type": "post.counts",
+            "post": post_id,
+            "likes_delta": likes,
+            "comments_delta": comments,
+        },
+    )
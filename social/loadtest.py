@@ -0,0 +1,516 @@
+"""In-process load generator for the WSGI/ASGI application.
+
+Drives ``core.wsgi.application`` (threads, optionally across forked
+processes) or ``core.asgi.application`` (concurrent coroutines) with a
+weighted mix of API operations. Target posts and users are drawn from a Zipf
+distribution so a few hot rows take most of the traffic, as in production.
+Nothing leaves the process: requests are plain WSGI environs / ASGI scopes
+against whatever database ``DATABASES`` points at (SQLite file or local
+Postgres).
+
+Used by ``manage.py loadtest``; see its ``--help`` for the knobs.
+"""
+
+import asyncio
+import bisect
+import io
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import OperationalError, connection, connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .counters import recount_likes
+from .models import Follow, Post
+
+User = get_user_model()
+
+DEFAULT_MIX = "feed=30,posts=25,like=20,comment=10,follow=10,register=5"
+USERNAME_PREFIX = "loadtest_"
+# Upper bounds in milliseconds; the last bucket is open-ended.
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            choices = ", ".join(OPERATIONS)
+            raise ValueError(f"Unknown operation {name!r}; choose from {choices}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Traffic mix needs at least one positive weight.")
+    return mix
+
+
+class ZipfSampler:
+    """Draw items with probability proportional to ``1 / rank ** s``."""
+
+    def __init__(self, items, s: float, rng: random.Random):
+        self.items = list(items)
+        self.rng = rng
+        weights = (1.0 / (rank**s) for rank in range(1, len(self.items) + 1))
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def sample(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return self.items[bisect.bisect_left(self.cumulative, point)]
+
+
+@dataclass
+class Dataset:
+    user_ids: list
+    post_ids: list
+    tokens: dict
+
+
+def prepare_dataset(users: int, posts: int, seed: int = 0) -> Dataset:
+    """Create (or reuse) ``loadtest_*`` users and posts and mint their tokens."""
+    rng = random.Random(seed)
+    existing = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    if existing < users:
+        password = make_password("password123")  # hash once, not per user
+        User.objects.bulk_create(
+            [
+                User(username=f"{USERNAME_PREFIX}{i}", password=password)
+                for i in range(existing, users)
+            ],
+            ignore_conflicts=True,
+        )
+    user_ids = list(
+        User.objects.filter(username__startswith=USERNAME_PREFIX)
+        .order_by("id")
+        .values_list("id", flat=True)[:users]
+    )
+    authors = ZipfSampler(user_ids, 1.0, rng)
+    have = Post.objects.filter(author_id__in=user_ids).count()
+    if have < posts:
+        Post.objects.bulk_create(
+            [
+                Post(author_id=authors.sample(), body=f"load test post {i}")
+                for i in range(have, posts)
+            ],
+            batch_size=1000,
+        )
+    post_ids = list(
+        Post.objects.filter(author_id__in=user_ids)
+        .order_by("id")
+        .values_list("id", flat=True)[:posts]
+    )
+    # Give every user a few follows of popular accounts so feeds are non-empty.
+    Follow.objects.bulk_create(
+        [
+            Follow(follower_id=uid, following_id=target)
+            for uid in user_ids
+            for target in {authors.sample() for _ in range(3)}
+            if target != uid
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+    recount_likes(Post.objects.filter(id__in=post_ids))
+    # Shuffle so hot ranks are not simply the oldest rows.
+    rng.shuffle(post_ids)
+    tokens = {
+        user.id: str(AccessToken.for_user(user))
+        for user in User.objects.filter(id__in=user_ids)
+    }
+    return Dataset(user_ids=user_ids, post_ids=post_ids, tokens=tokens)
+
+
+# Each operation returns (method, path, body or None, authenticated).
+def _op_feed(ctx):
+    return "GET", "/api/posts/feed/", None, True
+
+
+def _op_posts(ctx):
+    return "GET", f"/api/posts/?page={ctx.rng.randint(1, 3)}", None, False
+
+
+def _op_like(ctx):
+    return "POST", f"/api/posts/{ctx.posts.sample()}/like/", None, True
+
+
+def _op_comment(ctx):
+    body = {"body": f"load test comment {ctx.rng.random():.6f}"}
+    return "POST", f"/api/posts/{ctx.posts.sample()}/comments/", body, True
+
+
+def _op_follow(ctx):
+    return "POST", f"/api/users/{ctx.users.sample()}/follow/", None, True
+
+
+def _op_register(ctx):
+    body = {"username": f"lt_{uuid.uuid4().hex[:16]}", "password": "password123"}
+    return "POST", "/api/auth/register/", body, False
+
+
+OPERATIONS = {
+    "feed": _op_feed,
+    "posts": _op_posts,
+    "like": _op_like,
+    "comment": _op_comment,
+    "follow": _op_follow,
+    "register": _op_register,
+}
+
+
+@dataclass
+class OpStats:
+    count: int = 0
+    errors: int = 0
+    client_errors: int = 0
+    latencies: list = field(default_factory=list)
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.client_errors += other.client_errors
+        self.latencies.extend(other.latencies)
+
+
+@dataclass
+class WorkerResult:
+    ops: dict = field(default_factory=lambda: defaultdict(OpStats))
+    locked_errors: int = 0
+    write_seconds: float = 0.0
+
+    def merge(self, other):
+        for name, stats in other.ops.items():
+            self.ops[name].merge(stats)
+        self.locked_errors += other.locked_errors
+        self.write_seconds += other.write_seconds
+
+
+class _Context:
+    def __init__(self, dataset, mix, zipf_s, seed):
+        self.rng = random.Random(seed)
+        self.dataset = dataset
+        self.names = list(mix)
+        self.weights = list(itertools.accumulate(mix.values()))
+        self.posts = ZipfSampler(dataset.post_ids, zipf_s, self.rng)
+        self.users = ZipfSampler(dataset.user_ids, zipf_s, self.rng)
+
+    def next_request(self):
+        name = self.rng.choices(self.names, cum_weights=self.weights)[0]
+        method, path, body, auth = OPERATIONS[name](self)
+        actor = self.rng.choice(self.dataset.user_ids)
+        token = self.dataset.tokens[actor] if auth else None
+        payload = json.dumps(body).encode() if body is not None else b""
+        return name, method, path, payload, token
+
+
+def _record(result, name, status, elapsed):
+    stats = result.ops[name]
+    stats.count += 1
+    stats.latencies.append(elapsed)
+    if status >= 500:
+        stats.errors += 1
+    elif status >= 400 and status not in (401, 403, 404):
+        stats.client_errors += 1
+
+
+def _lock_wrapper(result, lock=None):
+    """Execute wrapper counting lock failures and time spent in writes."""
+    guard = lock or nullcontext()
+
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if "locked" in str(exc):
+                with guard:
+                    result.locked_errors += 1
+            raise
+        finally:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                with guard:
+                    result.write_seconds += time.perf_counter() - start
+
+    return wrapper
+
+
+@contextmanager
+def _wrap_new_connections(result):
+    """Install ``_lock_wrapper`` on every DB connection opened meanwhile.
+
+    Django's ASGI handler runs each request's sync code on a fresh thread
+    with its own connection, so there is no single connection to wrap.
+    """
+    wrapper = _lock_wrapper(result, threading.Lock())
+
+    def attach(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(attach, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(attach)
+
+
+def _wsgi_call(app, method, path, payload, token):
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(payload)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(payload),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if token:
+        environ["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    response = app(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, "close"):
+            response.close()
+    return status[0]
+
+
+def run_wsgi_worker(app, dataset, mix, zipf_s, seed, deadline, budget):
+    """Issue requests until ``deadline`` or until ``budget`` runs out."""
+    result = WorkerResult()
+    ctx = _Context(dataset, mix, zipf_s, seed)
+    with connection.execute_wrapper(_lock_wrapper(result)):
+        while time.monotonic() < deadline and budget.take():
+            name, method, path, payload, token = ctx.next_request()
+            start = time.perf_counter()
+            try:
+                status = _wsgi_call(app, method, path, payload, token)
+            except Exception:
+                status = 599
+            _record(result, name, status, time.perf_counter() - start)
+    connection.close()
+    return result
+
+
+class Budget:
+    """Thread-safe countdown of remaining requests (``None`` = unlimited)."""
+
+    def __init__(self, total):
+        self.remaining = total
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.remaining is None:
+            return True
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def run_wsgi(application, dataset, mix, threads, duration, requests, zipf_s, seed):
+    deadline = time.monotonic() + duration
+    budget = Budget(requests)
+    result = WorkerResult()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(
+                run_wsgi_worker,
+                application,
+                dataset,
+                mix,
+                zipf_s,
+                seed + i,
+                deadline,
+                budget,
+            )
+            for i in range(threads)
+        ]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+# Filled in before fork() so children inherit the (unpicklable) WSGI app.
+_fork_jobs = []
+
+
+def _process_entry(index):
+    return run_wsgi(*_fork_jobs[index])
+
+
+def run_wsgi_processes(
+    application, dataset, mix, processes, threads, duration, requests, zipf_s, seed
+):
+    """Fork ``processes`` workers, each running ``threads`` WSGI threads."""
+    import multiprocessing
+
+    connections.close_all()  # never share a DB socket across fork()
+    share = None if requests is None else -(-requests // processes)
+    _fork_jobs[:] = [
+        (application, dataset, mix, threads, duration, share, zipf_s, seed + 1000 * i)
+        for i in range(processes)
+    ]
+    result = WorkerResult()
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        for partial in pool.map(_process_entry, range(processes)):
+            result.merge(partial)
+    return result
+
+
+async def _asgi_call(app, method, path, payload, token):
+    path, _, query = path.partition("?")
+    headers = [(b"host", b"localhost"), (b"content-type", b"application/json")]
+    headers.append((b"content-length", str(len(payload)).encode()))
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    sent_body = False
+    status = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()  # never disconnects mid-request
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(application, dataset, mix, concurrency, duration, requests, zipf_s, seed):
+    deadline = time.monotonic() + duration
+    budget = Budget(requests)
+
+    async def worker(i):
+        result = WorkerResult()
+        ctx = _Context(dataset, mix, zipf_s, seed + i)
+        while time.monotonic() < deadline and budget.take():
+            name, method, path, payload, token = ctx.next_request()
+            start = time.perf_counter()
+            try:
+                status = await _asgi_call(application, method, path, payload, token)
+            except Exception:
+                status = 599
+            _record(result, name, status, time.perf_counter() - start)
+        return result
+
+    async def main():
+        return await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    result = WorkerResult()
+    with _wrap_new_connections(result):
+        partials = asyncio.run(main())
+    for partial in partials:
+        result.merge(partial)
+    return result
+
+
+def sample_pg_lock_waits(stop: threading.Event, samples: list, interval=0.1):
+    """Poll ``pg_locks`` for ungranted locks until ``stop`` is set."""
+    try:
+        while not stop.wait(interval):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                samples.append(cursor.fetchone()[0])
+    finally:
+        connection.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = int(round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def histogram(latencies):
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for seconds in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS, seconds * 1000)] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def summarize(result: WorkerResult, elapsed: float, lock_samples=None) -> dict:
+    all_latencies = []
+    ops = {}
+    for name, stats in sorted(result.ops.items()):
+        values = sorted(stats.latencies)
+        all_latencies.extend(values)
+        ops[name] = {
+            "requests": stats.count,
+            "rps": round(stats.count / elapsed, 2) if elapsed else 0.0,
+            "errors": stats.errors,
+            "error_rate": round(stats.errors / stats.count, 4) if stats.count else 0.0,
+            "client_errors": stats.client_errors,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p90_ms": round(percentile(values, 90) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+    total = sum(op["requests"] for op in ops.values())
+    errors = sum(op["errors"] for op in ops.values())
+    locks = {
+        "locked_errors": result.locked_errors,
+        "write_seconds": round(result.write_seconds, 3),
+    }
+    if lock_samples:
+        locks["pg_waiting_max"] = max(lock_samples)
+        locks["pg_waiting_avg"] = round(sum(lock_samples) / len(lock_samples), 2)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "operations": ops,
+        "histogram": histogram(all_latencies),
+        "db_locks": locks,
+    }
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from social.archive import archive_posts
+
+
+class Command(BaseCommand):
+    help = "Move posts older than a cutoff (and their comments) to cold storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int, default=settings.ARCHIVE_POSTS_AFTER_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--export-dir",
+            default=None,
+            help="Also append archived posts to gzip NDJSON files in this directory.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        moved = archive_posts(cutoff, options["batch_size"], options["export_dir"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} posts."))
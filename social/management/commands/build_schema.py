@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import (
+    FORMATS,
+    content_hash,
+    generate_schema,
+    load_stored_schema,
+    schema_path,
+    write_schema,
+)
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema once and store it for /api/schema/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if a stored schema differs from the current code.",
+        )
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Override output path (the suffix is replaced per format).",
+        )
+
+    def handle(self, *args, **options):
+        for fmt in FORMATS:
+            path = schema_path(fmt, options["file"])
+            body = generate_schema(fmt)
+            if options["check"]:
+                stored = load_stored_schema(path)
+                if stored is None:
+                    raise CommandError(f"No stored schema at {path}.")
+                if stored[1] != content_hash(body):
+                    raise CommandError(
+                        f"Stored schema at {path} is stale; "
+                        "run `manage.py build_schema`."
+                    )
+                continue
+            digest = write_schema(body, path)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path} (sha256 {digest})."))
+        if options["check"]:
+            self.stdout.write(self.style.SUCCESS("Stored schema is up to date."))
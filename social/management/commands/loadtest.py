@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from social import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the WSGI/ASGI app in-process with a Zipf-skewed traffic mix and "
+        "report throughput, latency and DB lock statistics. Writes loadtest_* "
+        "users, posts, likes, follows and comments into the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--app", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Fork this many WSGI processes (needs a file DB or Postgres).",
+        )
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument(
+            "--requests", type=int, default=None, help="Stop after this many."
+        )
+        parser.add_argument("--mix", default=loadtest.DEFAULT_MIX)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--zipf", type=float, default=1.1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", dest="json_path", default=None)
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options["app"] == "asgi" and options["processes"] > 1:
+            raise CommandError("--processes only applies to --app wsgi.")
+
+        if settings.DEBUG:
+            warning = "DEBUG is on; set DEBUG=0 for production-like numbers."
+            self.stderr.write(self.style.WARNING(warning))
+        # Import the app before silencing request logs: the first import runs
+        # django.setup(), which reapplies LOGGING.
+        if options["app"] == "asgi":
+            from core.asgi import application
+        else:
+            from core.wsgi import application
+
+        dataset = loadtest.prepare_dataset(
+            options["users"], options["posts"], options["seed"]
+        )
+        args = (
+            application,
+            dataset,
+            mix,
+            options["threads"],
+            options["duration"],
+            options["requests"],
+            options["zipf"],
+            options["seed"],
+        )
+
+        stop = threading.Event()
+        samples = []
+        monitor = None
+        if connection.vendor == "postgresql":
+            monitor = threading.Thread(
+                target=loadtest.sample_pg_lock_waits, args=(stop, samples)
+            )
+            monitor.start()
+        # 5xx responses are counted in the report; don't log a traceback each.
+        request_logger = logging.getLogger("django.request")
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        started = time.perf_counter()
+        try:
+            if options["app"] == "asgi":
+                result = loadtest.run_asgi(*args)
+            elif options["processes"] > 1:
+                result = loadtest.run_wsgi_processes(
+                    application, dataset, mix, options["processes"], *args[3:]
+                )
+            else:
+                result = loadtest.run_wsgi(*args)
+        finally:
+            request_logger.setLevel(previous_level)
+            stop.set()
+            if monitor is not None:
+                monitor.join()
+        report = loadtest.summarize(result, time.perf_counter() - started, samples)
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as fh:
+                json.dump(report, fh, indent=2)
+        self.print_report(report)
+
+    def print_report(self, report):
+        write = self.stdout.write
+        write(
+            f"{report['requests']} requests in {report['elapsed_s']}s: "
+            f"{report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}"
+        )
+        write(
+            f"{'operation':<10}{'reqs':>8}{'rps':>10}{'err':>6}"
+            f"{'p50ms':>9}{'p90ms':>9}{'p99ms':>9}{'maxms':>9}"
+        )
+        for name, op in report["operations"].items():
+            write(
+                f"{name:<10}{op['requests']:>8}{op['rps']:>10}{op['errors']:>6}"
+                f"{op['p50_ms']:>9}{op['p90_ms']:>9}{op['p99_ms']:>9}{op['max_ms']:>9}"
+            )
+        write("latency histogram:")
+        peak = max(report["histogram"].values()) or 1
+        for label, count in report["histogram"].items():
+            write(f"  {label:>9} {count:>7} {'#' * round(40 * count / peak)}")
+        write(f"db locks: {report['db_locks']}")
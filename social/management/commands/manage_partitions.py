@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from social.partitioning import (
+    PARTITIONED_MODELS,
+    convert_to_partitioned,
+    ensure_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild unpartitioned tables as partitioned (copies every row).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(
+                f"Partitioning needs PostgreSQL; skipping on {connection.vendor}."
+            )
+            return
+        now = timezone.now()
+        ahead = options["months_ahead"]
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            if is_partitioned(connection, table):
+                created = ensure_partitions(connection, table, now, ahead)
+                self.stdout.write(f"{table}: ensured {', '.join(created)}")
+            elif options["convert"]:
+                convert_to_partitioned(connection, model, now, ahead)
+                self.stdout.write(self.style.SUCCESS(f"{table}: converted"))
+            else:
+                self.stdout.write(
+                    self.style.WARNING(f"{table}: not partitioned; use --convert")
+                )
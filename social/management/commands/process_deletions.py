@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from social import deletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending user/post deletion jobs in bounded batches. Safe to rerun "
+        "or run from cron; interrupted jobs resume from their last batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop each job after this many batches (it stays pending).",
+        )
+        parser.add_argument(
+            "--retry-failed", action="store_true", help="Requeue failed jobs first."
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            default=None,
+            help="Deactivate this user id and queue their deletion before running.",
+        )
+
+    def handle(self, *args, **options):
+        if options["user"] is not None:
+            User = get_user_model()
+            try:
+                user = User.objects.get(pk=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+            deletion.request_user_deletion(user)
+        finished = deletion.process_pending(
+            max_batches=options["max_batches"],
+            batch_size=options["batch_size"],
+            retry_failed=options["retry_failed"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Finished {finished} deletion jobs."))
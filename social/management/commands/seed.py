@@ -1,6 +1,7 @@
 import random
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from social.counters import recount_likes
 from social.models import Post, Comment, Like, Follow
 
 User = get_user_model()
@@ -61,5 +62,6 @@ class Command(BaseCommand):
             likers = random.sample(users, k=random.randint(0, len(users)))
             for u in likers:
                 Like.objects.get_or_create(user=u, post=p)
+        recount_likes(Post.objects.filter(pk__in=[p.id for p in posts]))
 
         self.stdout.write(self.style.SUCCESS("Seed data created."))
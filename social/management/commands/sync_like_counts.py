@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social.counters import recount_likes
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.likes_total from the Like table (e.g. after a crash)."
+
+    def handle(self, *args, **options):
+        updated = recount_likes()
+        self.stdout.write(self.style.SUCCESS(f"Recounted likes for {updated} posts."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_total(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    Like = apps.get_model("social", "Like")
+    counts = (
+        Like.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Post.objects.update(likes_total=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import migrations
+
+INDEX_NAME = "social_user_username_lower_uniq"
+
+
+def _table(apps):
+    return apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+
+def create_index(apps, schema_editor):
+    qn = schema_editor.quote_name
+    table, username = qn(_table(apps)), qn("username")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT LOWER({username}) FROM {table} "
+            f"GROUP BY LOWER({username}) HAVING COUNT(*) > 1 LIMIT 10"
+        )
+        clashes = [row[0] for row in cursor.fetchall()]
+    if clashes:
+        raise RuntimeError(
+            "Usernames differing only in case must be renamed before the "
+            f"case-insensitive unique index can be built: {', '.join(clashes)}"
+        )
+    # CONCURRENTLY keeps signups flowing while a large table is indexed; it is
+    # only available on Postgres and outside a transaction (atomic = False).
+    concurrently = (
+        "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    )
+    # A failed concurrent build leaves an INVALID index behind that enforces
+    # nothing; drop any leftover instead of skipping it with IF NOT EXISTS.
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {qn(INDEX_NAME)}")
+    schema_editor.execute(
+        f"CREATE UNIQUE INDEX {concurrently}{qn(INDEX_NAME)} "
+        f"ON {table} (LOWER({username}))"
+    )
+
+
+def drop_index(apps, schema_editor):
+    qn = schema_editor.quote_name
+    schema_editor.execute(f"DROP INDEX IF EXISTS {qn(INDEX_NAME)}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("social", "0004_archived_post"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0005_username_lower_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeletionJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("user", "User"), ("post", "Post")], max_length=8
+                    ),
+                ),
+                ("target_id", models.BigIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=8,
+                    ),
+                ),
+                ("step", models.PositiveSmallIntegerField(default=0)),
+                ("rows_deleted", models.BigIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="is_hidden",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name="deletionjob",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "target_id"), name="unique_deletion_job"
+            ),
+        ),
+    ]
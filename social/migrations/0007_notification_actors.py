@@ -0,0 +1,73 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_actors(apps, schema_editor):
+    # Earlier actors of existing groups are unknown; keep the last one so a
+    # repeat by that person does not count as someone new.
+    Notification = apps.get_model("social", "Notification")
+    NotificationActor = apps.get_model("social", "NotificationActor")
+    groups = Notification.objects.filter(last_actor__isnull=False).values_list(
+        "id", "last_actor_id"
+    )
+    NotificationActor.objects.bulk_create(
+        (NotificationActor(notification_id=n, actor_id=a) for n, a in groups.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0006_deletion_jobs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="actor_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name="NotificationActor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "notification",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="actors",
+                        to="social.notification",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="notificationactor",
+            constraint=models.UniqueConstraint(
+                fields=("notification", "actor"), name="unique_notification_actor"
+            ),
+        ),
+        migrations.RunPython(backfill_actors, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 from django.db.models import Q
+from django.utils import timezone
 
 
 class TimeStamped(models.Model):
@@ -16,6 +17,10 @@ class Post(TimeStamped):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="posts"
     )
     body = models.TextField(max_length=1000)
+    # Denormalised like count, maintained by social.counters.
+    likes_total = models.IntegerField(default=0)
+    # Set when deletion is requested; rows are removed later by social.deletion.
+    is_hidden = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-created_at"]
@@ -82,3 +87,174 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"Follow({self.follower_id}->{self.following_id})"
+
+
+class Notification(models.Model):
+    """One aggregated row per (recipient, verb, target, time bucket).
+
+    Repeated events inside a bucket bump ``event_count`` and ``last_actor``
+    instead of inserting new rows, so a viral post yields a single row per
+    bucket ("alice and 41 others liked your post"). ``actor_count`` only
+    grows for actors new to the group (see ``NotificationActor``), so one
+    person re-liking or commenting repeatedly is not counted as many.
+    """
+
+    VERB_LIKE = "like"
+    VERB_COMMENT = "comment"
+    VERB_FOLLOW = "follow"
+    VERB_CHOICES = [
+        (VERB_LIKE, "Like"),
+        (VERB_COMMENT, "Comment"),
+        (VERB_FOLLOW, "Follow"),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications"
+    )
+    verb = models.CharField(max_length=16, choices=VERB_CHOICES)
+    # Null for follow notifications (the target is the recipient).
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    bucket = models.DateTimeField()
+    last_actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    event_count = models.PositiveIntegerField(default=1)
+    actor_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-updated_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipient", "verb", "post", "bucket"],
+                name="unique_notification_group",
+            ),
+            # NULLs are distinct in unique indexes, so post-less groups need
+            # their own partial constraint.
+            models.UniqueConstraint(
+                fields=["recipient", "verb", "bucket"],
+                condition=Q(post__isnull=True),
+                name="unique_notification_group_no_post",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["recipient", "-updated_at", "-id"]),
+        ]
+
+    def __str__(self):
+        return f"Notification({self.verb} x{self.event_count} -> {self.recipient_id})"
+
+
+class NotificationActor(models.Model):
+    """Distinct actors seen in a notification group, backing ``actor_count``.
+
+    At most ``NOTIFICATION_MAX_ACTORS`` rows per group (see social.notifications).
+    """
+
+    notification = models.ForeignKey(
+        Notification, on_delete=models.CASCADE, related_name="actors"
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["notification", "actor"], name="unique_notification_actor"
+            ),
+        ]
+
+    def __str__(self):
+        return f"NotificationActor({self.notification_id}, {self.actor_id})"
+
+
+class NotificationCounter(models.Model):
+    """Per-user unread counter and read watermark.
+
+    Groups updated after ``last_read_at`` are unread; marking everything read
+    only touches this row.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_counter",
+    )
+    unread = models.PositiveIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"NotificationCounter(user={self.user_id}, unread={self.unread})"
+
+
+class ArchivedPost(models.Model):
+    """Cold storage for posts moved out of ``Post`` by ``archive_posts``.
+
+    Keeps the original post id so ``/api/posts/{id}/`` keeps resolving; the
+    serialized post and its comments live in a zlib-compressed JSON payload.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.BinaryField()
+
+    def __str__(self):
+        return f"ArchivedPost({self.id}) by {self.author_id}"
+
+
+class DeletionJob(models.Model):
+    """Resumable, batched deletion of a user or post and everything under it.
+
+    ``target_id`` is a plain integer so the job outlives the row it deletes.
+    ``step`` and ``rows_deleted`` record progress; see ``social.deletion``.
+    """
+
+    KIND_USER = "user"
+    KIND_POST = "post"
+    KIND_CHOICES = [(KIND_USER, "User"), (KIND_POST, "Post")]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    target_id = models.BigIntegerField()
+    status = models.CharField(
+        max_length=8, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True
+    )
+    step = models.PositiveSmallIntegerField(default=0)
+    rows_deleted = models.BigIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "target_id"], name="unique_deletion_job"
+            ),
+        ]
+
+    def __str__(self):
+        return f"DeletionJob({self.kind} {self.target_id}, {self.status})"
@@ -0,0 +1,122 @@
+"""Coalesced activity notifications.
+
+Events are folded into one ``Notification`` row per (recipient, verb, post,
+time bucket) with conditional UPDATEs, falling back to an INSERT only for the
+first event of a bucket. ``NotificationActor`` rows record who already
+acted in a group, so ``actor_count`` ("bob and 2 others") counts people
+rather than events. Tracking stops at ``NOTIFICATION_MAX_ACTORS`` per group
+("bob and 9+ others"), so a viral post costs no more than a few rows and
+no extra writes per event once the cap is reached. The unread total lives in a single
+``NotificationCounter`` row per user together with a read watermark, so
+marking everything read is a single-row write no matter how many events
+were recorded.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, NotificationActor, NotificationCounter
+
+
+def bucket_start(when: datetime) -> datetime:
+    """Return the start of the aggregation bucket containing ``when``."""
+    size = max(int(settings.NOTIFICATION_BUCKET_SECONDS), 1)
+    ts = int(when.timestamp())
+    return datetime.fromtimestamp(ts - ts % size, tz=dt_timezone.utc)
+
+
+def notify(recipient_id: int, verb: str, actor, post=None) -> None:
+    """Record one event for ``recipient_id``; self-inflicted events are ignored."""
+    if actor is None or recipient_id == actor.id:
+        return
+    now = timezone.now()
+    bucket = bucket_start(now)
+    group = Notification.objects.filter(
+        recipient_id=recipient_id, verb=verb, post=post, bucket=bucket
+    )
+    bump = {"event_count": F("event_count") + 1, "last_actor": actor, "updated_at": now}
+
+    watermark = (
+        NotificationCounter.objects.filter(user_id=recipient_id)
+        .values_list("last_read_at", flat=True)
+        .first()
+    )
+    # Group already unread: the unread total does not change.
+    unread_group = group
+    if watermark is not None:
+        unread_group = group.filter(updated_at__gt=watermark)
+    if unread_group.update(**bump):
+        _record_actor(group, actor)
+        return
+    # Group was read since its last event: it becomes unread again.
+    if watermark is not None and group.update(**bump):
+        _record_actor(group, actor)
+        _increment_unread(recipient_id)
+        return
+    try:
+        with transaction.atomic():
+            notification = Notification.objects.create(
+                recipient_id=recipient_id,
+                verb=verb,
+                post=post,
+                bucket=bucket,
+                last_actor=actor,
+                updated_at=now,
+            )
+            NotificationActor.objects.create(notification=notification, actor=actor)
+    except IntegrityError:
+        # A concurrent request created the group first and counted it.
+        group.update(**bump)
+        _record_actor(group, actor)
+        return
+    _increment_unread(recipient_id)
+
+
+def _record_actor(group, actor) -> None:
+    """Bump ``actor_count`` if ``actor`` is new to the (single-row) ``group``."""
+    notification_id = (
+        group.filter(actor_count__lt=settings.NOTIFICATION_MAX_ACTORS)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if notification_id is None:
+        return
+    try:
+        with transaction.atomic():
+            NotificationActor.objects.create(
+                notification_id=notification_id, actor=actor
+            )
+    except IntegrityError:
+        return
+    Notification.objects.filter(pk=notification_id).update(
+        actor_count=F("actor_count") + 1
+    )
+
+
+def _increment_unread(user_id: int) -> None:
+    if not NotificationCounter.objects.filter(user_id=user_id).update(
+        unread=F("unread") + 1
+    ):
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(user_id=user_id, unread=1)
+        except IntegrityError:
+            NotificationCounter.objects.filter(user_id=user_id).update(
+                unread=F("unread") + 1
+            )
+
+
+def get_counter(user_id: int) -> NotificationCounter:
+    counter = NotificationCounter.objects.filter(user_id=user_id).first()
+    return counter or NotificationCounter(user_id=user_id)
+
+
+def mark_all_read(user_id: int) -> None:
+    """Move the read watermark to now and reset the unread total."""
+    NotificationCounter.objects.update_or_create(
+        user_id=user_id, defaults={"unread": 0, "last_read_at": timezone.now()}
+    )
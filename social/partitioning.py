@@ -0,0 +1,181 @@
+"""Monthly range partitioning on PostgreSQL.
+
+``Comment`` is the partitioned table: nothing references it by foreign key,
+so it can carry the ``(id, created_at)`` primary key Postgres requires.
+``Post`` is referenced by likes, comments and notifications through ``id``
+alone, which a partitioned table cannot back, so old posts are moved out by
+``archive_posts`` instead.
+
+``manage_partitions --convert`` rebuilds an unpartitioned table once (run it
+in a maintenance window; it copies every row). Afterwards run
+``manage_partitions`` regularly (e.g. daily cron) to create partitions ahead
+of time so inserts rarely land in the default partition. If the cron was
+missed and they did, ``ensure_partitions`` moves those rows into the new
+month's partition (briefly detaching the default partition to do so).
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+from .models import Comment
+
+PARTITIONED_MODELS = [Comment]
+PARTITION_COLUMN = "created_at"
+
+
+def month_start(when: datetime) -> datetime:
+    return datetime(when.year, when.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def month_range(first: datetime, last: datetime):
+    """Yield month starts from ``first``'s month through ``last``'s month."""
+    month, end = month_start(first), month_start(last)
+    while month <= end:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_pdefault"
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def is_partitioned(connection, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(cursor, connection, table: str, month: datetime) -> str:
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [month.isoformat(), add_months(month, 1).isoformat()],
+    )
+    return name
+
+
+def ensure_partition(cursor, connection, table: str, month: datetime) -> str:
+    """Create ``month``'s partition, adopting its rows from the default one.
+
+    Postgres refuses to create a partition whose range already has rows in
+    the default partition, so in that case the default is detached, the rows
+    are moved and it is attached again, all in one transaction.
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    if _table_exists(cursor, name):
+        return name
+    default = default_partition_name(table)
+    bounds = [month.isoformat(), add_months(month, 1).isoformat()]
+    column = qn(PARTITION_COLUMN)
+    in_range = f"{column} >= %s AND {column} < %s"
+    if _table_exists(cursor, default):
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE {in_range})", bounds
+        )
+        stranded = cursor.fetchone()[0]
+    else:
+        stranded = False
+    if not stranded:
+        return create_partition(cursor, connection, table, month)
+    with transaction.atomic(using=connection.alias):
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}")
+        create_partition(cursor, connection, table, month)
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(default)} WHERE {in_range} "
+            f"RETURNING *) INSERT INTO {qn(name)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT"
+        )
+    return name
+
+
+def ensure_partitions(connection, table: str, now: datetime, months_ahead: int):
+    """Create partitions for the current month and ``months_ahead`` after it."""
+    with connection.cursor() as cursor:
+        return [
+            ensure_partition(cursor, connection, table, month)
+            for month in month_range(now, add_months(month_start(now), months_ahead))
+        ]
+
+
+def convert_to_partitioned(connection, model, now: datetime, months_ahead: int):
+    """Rebuild ``model``'s table as a partitioned copy of itself."""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+    # Not "<table>_id_seq": the legacy identity sequence keeps that name.
+    seq = f"{table}_part_id_seq"
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Deferred FK checks still queued against the old table (when called
+        # inside an outer transaction) would block dropping it at the end.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({qn(PARTITION_COLUMN)})"
+        )
+        # Identity columns are not allowed on partitioned tables before
+        # Postgres 17, so ids come from a plain sequence default.
+        cursor.execute(f"CREATE SEQUENCE {qn(seq)}")
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s)",
+            [seq],
+        )
+        cursor.execute(f"ALTER SEQUENCE {qn(seq)} OWNED BY {qn(table)}.id")
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(PARTITION_COLUMN)})"
+        )
+        for field in model._meta.concrete_fields:
+            if field.is_relation:
+                target = field.related_model._meta
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD FOREIGN KEY ({qn(field.column)}) "
+                    f"REFERENCES {qn(target.db_table)} ({qn(target.pk.column)}) "
+                    f"DEFERRABLE INITIALLY DEFERRED"
+                )
+                cursor.execute(f"CREATE INDEX ON {qn(table)} ({qn(field.column)})")
+        cursor.execute(f"CREATE INDEX ON {qn(table)} ({qn(PARTITION_COLUMN)})")
+
+        cursor.execute(f"SELECT MIN({qn(PARTITION_COLUMN)}) FROM {qn(legacy)}")
+        oldest = cursor.fetchone()[0] or now
+        last = add_months(month_start(now), months_ahead)
+        for month in month_range(min(oldest, now), last):
+            create_partition(cursor, connection, table, month)
+        default = default_partition_name(table)
+        cursor.execute(
+            f"CREATE TABLE {qn(default)} PARTITION OF {qn(table)} DEFAULT"
+        )
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(
+            f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(table)}), 0) + 1, "
+            f"false)",
+            [seq],
+        )
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
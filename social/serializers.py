@@ -1,13 +1,26 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 
-from .models import Post, Comment, Follow, Like
+from core.profiling import serializer_timer
+
+from . import counters
+from .models import Post, Comment, Follow, Like, Notification
 
 User = get_user_model()
 
 
-class UserPublicSerializer(serializers.ModelSerializer):
+# Reports rendering time to the request profiler (core.profiling). A comment
+# rather than a docstring so it does not leak into every schema description.
+class TimedModelSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class UserPublicSerializer(TimedModelSerializer):
     followers_count = serializers.IntegerField(read_only=True)
     following_count = serializers.IntegerField(read_only=True)
 
@@ -16,7 +29,7 @@ class UserPublicSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "followers_count", "following_count"]
 
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(TimedModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
     username = serializers.CharField()
 
@@ -25,17 +38,26 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "password"]
 
     def create(self, validated_data):
-        return User.objects.create_user(
-            username=validated_data["username"], password=validated_data["password"]
-        )
-
-    def validate_username(self, value):
-        if User.objects.filter(username__iexact=value).exists():
-            raise serializers.ValidationError("Username already taken.")
-        return value
+        # Uniqueness (case-insensitive, via the LOWER(username) unique index) is
+        # enforced by the insert itself: no check-then-insert race or extra query.
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    username=validated_data["username"],
+                    password=validated_data["password"],
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"username": ["Username already taken."]}
+            )
+
+
+class UsernameAvailabilitySerializer(serializers.Serializer):
+    username = serializers.CharField()
+    available = serializers.BooleanField()
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedModelSerializer):
     author = UserPublicSerializer(read_only=True)
     post = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -44,7 +66,7 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ["id", "author", "post", "body", "created_at", "updated_at"]
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedModelSerializer):
     author = UserPublicSerializer(read_only=True)
     likes_count = serializers.SerializerMethodField()
     comments_count = serializers.SerializerMethodField()
@@ -63,10 +85,7 @@ class PostSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(field=serializers.IntegerField())
     def get_likes_count(self, obj) -> int:
-        annotated = getattr(obj, "likes_count", None)
-        if annotated is not None:
-            return int(annotated)
-        return obj.likes.count()
+        return counters.likes_count(obj)
 
     @extend_schema_field(field=serializers.IntegerField())
     def get_comments_count(self, obj) -> int:
@@ -76,7 +95,7 @@ class PostSerializer(serializers.ModelSerializer):
         return obj.comments.count()
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(TimedModelSerializer):
     follower = UserPublicSerializer(read_only=True)
     following = UserPublicSerializer(read_only=True)
 
@@ -85,8 +104,58 @@ class FollowSerializer(serializers.ModelSerializer):
         fields = ["id", "follower", "following", "created_at"]
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class LikeSerializer(TimedModelSerializer):
     class Meta:
         model = Like
         fields = ["id", "user", "post", "created_at"]
         read_only_fields = fields
+
+
+class NotificationSerializer(TimedModelSerializer):
+    last_actor = UserPublicSerializer(read_only=True)
+    unread = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = [
+            "id",
+            "verb",
+            "post",
+            "last_actor",
+            "event_count",
+            "actor_count",
+            "unread",
+            "summary",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    @extend_schema_field(field=serializers.BooleanField())
+    def get_unread(self, obj) -> bool:
+        last_read_at = self.context.get("last_read_at")
+        return last_read_at is None or obj.updated_at > last_read_at
+
+    @extend_schema_field(field=serializers.CharField())
+    def get_summary(self, obj) -> str:
+        actor = obj.last_actor.username if obj.last_actor else "Someone"
+        others = obj.actor_count - 1
+        if obj.actor_count >= settings.NOTIFICATION_MAX_ACTORS and others > 0:
+            actor = f"{actor} and {others}+ others"
+        elif others > 0:
+            actor = f"{actor} and {others} other{'s' if others > 1 else ''}"
+        if obj.verb == Notification.VERB_FOLLOW:
+            return f"{actor} followed you"
+        if obj.verb == Notification.VERB_COMMENT:
+            return f"{actor} commented on your post"
+        return f"{actor} liked your post"
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=serializers.CharField(max_length=2000),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS,
+        help_text="Relative GET paths under /api/, e.g. /api/posts/1/.",
+    )
@@ -0,0 +1,151 @@
+"""ASGI Server-Sent Events endpoint (``/api/stream/``).
+
+Mounted directly in ``core/asgi.py`` in front of Django so long-lived
+connections never occupy a sync worker thread. Authenticates with the same
+JWT access tokens as the REST API, passed as ``Authorization: Bearer`` or,
+for browsers' ``EventSource``, as ``?token=``. Optional ``?posts=1,2,3``
+subscribes to count changes for those posts; new posts by followed authors
+are always streamed.
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .events import TooManyConnections, get_hub
+from .models import Follow
+
+STREAM_PATH = "/api/stream/"
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _raw_token(scope, query):
+    auth = _header(scope, b"authorization")
+    if auth:
+        parts = auth.split()
+        if len(parts) == 2 and parts[0].lower() == b"bearer":
+            return parts[1].decode()
+    tokens = query.get("token")
+    return tokens[0] if tokens else None
+
+
+def _parse_post_ids(query):
+    ids = []
+    for chunk in query.get("posts", []):
+        for value in chunk.split(","):
+            if value.strip().isdigit():
+                ids.append(int(value))
+    return ids[: settings.SSE_MAX_POST_SUBSCRIPTIONS]
+
+
+@sync_to_async
+def _authenticate_and_load(raw_token):
+    """Resolve the user and their followed authors; ``(None, [])`` if invalid."""
+    close_old_connections()
+    try:
+        auth = JWTAuthentication()
+        user = auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        return None, []
+    if not user.is_active:
+        return None, []
+    authors = list(
+        Follow.objects.filter(follower=user).values_list("following_id", flat=True)
+    )
+    return user, authors
+
+
+def _format(message: dict) -> bytes:
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n".encode()
+
+
+async def _respond(send, status: int, detail: str):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.body", "body": body})
+
+
+async def stream(scope, receive, send):
+    if scope["method"] != "GET":
+        return await _respond(send, 405, "Method not allowed.")
+    query = parse_qs(scope.get("query_string", b"").decode())
+    raw_token = _raw_token(scope, query)
+    user, authors = None, []
+    if raw_token:
+        user, authors = await _authenticate_and_load(raw_token)
+    if user is None:
+        detail = "Authentication credentials were not provided."
+        return await _respond(send, 401, detail)
+
+    channels = [f"author:{author_id}" for author_id in authors]
+    channels += [f"post:{post_id}" for post_id in _parse_post_ids(query)]
+    try:
+        sub = get_hub().subscribe(user.id, channels)
+    except TooManyConnections:
+        return await _respond(send, 429, "Too many open streams.")
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                return
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 5000\n\n",
+                "more_body": True,
+            }
+        )
+        while not disconnected.is_set():
+            getter = asyncio.ensure_future(sub.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, watcher},
+                timeout=settings.SSE_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                body = _format(getter.result())
+            else:
+                getter.cancel()
+                if disconnected.is_set():
+                    break
+                body = b": ping\n\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+    finally:
+        sub.close()
+        watcher.cancel()
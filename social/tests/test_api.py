@@ -1,6 +1,33 @@
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+from io import StringIO
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase
 
+from core.asgi import application
+from social import counters, events, notifications, partitioning
+from social.models import (
+    ArchivedPost,
+    Comment,
+    DeletionJob,
+    Follow,
+    Like,
+    Notification,
+    Post,
+)
+
 User = get_user_model()
 
 
@@ -33,6 +60,40 @@ class SocialAPITests(APITestCase):
         self.assertEqual(r2.status_code, 200)
         self.assertIn("access", r2.data)
 
+    def test_register_rejects_case_insensitive_duplicate(self):
+        r = self.client.post(
+            "/api/auth/register/",
+            {"username": "ALICE", "password": "password123"},
+            format="json",
+        )
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["username"], ["Username already taken."])
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_username_available(self):
+        r = self.client.get("/api/auth/username-available/", {"username": "Alice"})
+        self.assertEqual(r.status_code, 200)
+        self.assertFalse(r.data["available"])
+        r = self.client.get("/api/auth/username-available/", {"username": "zed"})
+        self.assertTrue(r.data["available"])
+        r = self.client.get("/api/auth/username-available/")
+        self.assertEqual(r.status_code, 400)
+
+    def test_username_available_agrees_with_registration_outside_ascii(self):
+        self.client.post(
+            "/api/auth/register/",
+            {"username": "ÉMILE", "password": "password123"},
+            format="json",
+        )
+        r = self.client.get("/api/auth/username-available/", {"username": "ÉMILE"})
+        self.assertFalse(r.data["available"])
+        again = self.client.post(
+            "/api/auth/register/",
+            {"username": "ÉMILE", "password": "password123"},
+            format="json",
+        )
+        self.assertEqual(again.status_code, 400)
+
     def test_create_post_and_permissions(self):
         headers = self.auth_headers()
         r = self.client.post(
@@ -72,6 +133,52 @@ class SocialAPITests(APITestCase):
         self.assertEqual(r3.status_code, 200)
         r4 = self.client.post(f"/api/posts/{pid}/unlike/", **headers)  # still ok
         self.assertEqual(r4.status_code, 200)
+        self.assertEqual(self.client.get(f"/api/posts/{pid}/").data["likes_count"], 0)
+
+    def test_buffered_like_counts(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Hot"}, format="json", **headers
+        ).data["id"]
+        # No timed flushes mid-assertion; the test flushes explicitly.
+        self.addCleanup(counters.reset_buffer, flush=False)
+        with override_settings(
+            LIKE_COUNTER_BUFFERED=True, LIKE_COUNTER_FLUSH_SECONDS=3600
+        ):
+            counters.reset_buffer(flush=False)
+            bob = self.auth_headers("bob")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f"/api/posts/{pid}/like/", **headers)
+                self.client.post(f"/api/posts/{pid}/like/", **bob)
+                self.client.post(f"/api/posts/{pid}/unlike/", **headers)
+            # A delta whose transaction rolls back is never buffered
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    counters.apply_like_delta(pid, 1)
+                    raise RuntimeError
+            # Not flushed yet, but reads include pending deltas
+            self.assertEqual(Post.objects.get(pk=pid).likes_total, 0)
+            r = self.client.get(f"/api/posts/{pid}/")
+            self.assertEqual(r.data["likes_count"], 1)
+            counters.get_buffer().flush()
+        self.assertEqual(Post.objects.get(pk=pid).likes_total, 1)
+        self.assertEqual(self.client.get(f"/api/posts/{pid}/").data["likes_count"], 1)
+
+    def test_like_buffer_threshold_flushes_on_the_flusher_thread(self):
+        buffer = counters.LikeCounterBuffer(flush_seconds=3600, flush_threshold=2)
+        flushed_on = []
+        flushed = threading.Event()
+
+        def fake_flush():
+            flushed_on.append(threading.current_thread().name)
+            flushed.set()
+
+        with mock.patch.object(buffer, "flush", side_effect=fake_flush):
+            buffer.add(1, 1)
+            buffer.add(1, 1)
+            self.assertTrue(flushed.wait(5))
+            buffer.stop(flush=False)
+        self.assertEqual(flushed_on, ["like-counter-flusher"])
 
     def test_follow_unfollow_and_feed(self):
         headers_alice = self.auth_headers()
@@ -133,3 +240,558 @@ class SocialAPITests(APITestCase):
     def test_openapi_available(self):
         r = self.client.get("/api/schema/")
         self.assertEqual(r.status_code, 200)
+        self.assertIn("ETag", r)
+        r2 = self.client.get("/api/schema/", HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r2.status_code, 304)
+
+    def test_openapi_format_matches_live_view(self):
+        cases = [
+            ({}, "application/vnd.oai.openapi; charset=utf-8"),
+            ({"format": "yaml"}, "application/vnd.oai.openapi; charset=utf-8"),
+            ({"format": "json"}, "application/vnd.oai.openapi+json"),
+        ]
+        accept_json = {"HTTP_ACCEPT": "application/json"}
+        etags = set()
+        for params, content_type in cases:
+            stored = self.client.get("/api/schema/", params)
+            with override_settings(DEBUG=True):
+                live = self.client.get("/api/schema/", params)
+            self.assertEqual(stored["Content-Type"], content_type)
+            self.assertEqual(live["Content-Type"], content_type)
+            etags.add(stored["ETag"])
+        self.assertEqual(len(etags), 2)  # one per format
+        r = self.client.get("/api/schema/", **accept_json)
+        self.assertEqual(r["Content-Type"], "application/json")
+        self.assertEqual(json.loads(r.content)["openapi"][:2], "3.")
+        self.assertTrue(
+            self.client.get("/api/schema/").content.startswith(b"openapi: ")
+        )
+        self.assertEqual(
+            self.client.get("/api/schema/", {"format": "xml"}).status_code, 404
+        )
+
+    def test_batch_get(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Batched"}, format="json", **headers
+        ).data["id"]
+        paths = [
+            f"/api/posts/{pid}/",
+            f"/api/posts/{pid}/comments/",
+            f"/api/users/{self.user1.id}/",
+            "/api/posts/feed/?page=1",
+            f"/api/posts/{pid}/",
+            "/api/nope/",
+            "/api/batch/",
+        ]
+        r = self.client.post(
+            "/api/batch/", {"requests": paths}, format="json", **headers
+        )
+        self.assertEqual(r.status_code, 200)
+        responses = r.data["responses"]
+        self.assertEqual(len(responses), 6)  # duplicate collapsed
+        self.assertEqual(responses[f"/api/posts/{pid}/"]["body"]["body"], "Batched")
+        self.assertEqual(responses["/api/posts/feed/?page=1"]["status"], 200)
+        self.assertEqual(responses["/api/posts/feed/?page=1"]["body"]["count"], 1)
+        self.assertEqual(responses["/api/nope/"]["status"], 404)
+        self.assertEqual(responses["/api/batch/"]["status"], 400)
+        # Anonymous sub-requests do not get the feed
+        anon = self.client.post(
+            "/api/batch/", {"requests": ["/api/posts/feed/"]}, format="json"
+        )
+        self.assertEqual(anon.data["responses"]["/api/posts/feed/"]["status"], 401)
+        too_many = self.client.post(
+            "/api/batch/", {"requests": ["/api/posts/"] * 11}, format="json"
+        )
+        self.assertEqual(too_many.status_code, 400)
+
+    def test_batch_isolates_failing_sub_request(self):
+        pid = self.client.post(
+            "/api/posts/", {"body": "Still here"}, format="json", **self.auth_headers()
+        ).data["id"]
+        paths = [f"/api/posts/{pid}/", "/api/posts/abc/comments/", "/api/posts/"]
+        with self.assertLogs("social.views", "ERROR"):
+            r = self.client.post("/api/batch/", {"requests": paths}, format="json")
+        self.assertEqual(r.status_code, 200)
+        responses = r.data["responses"]
+        self.assertEqual(responses["/api/posts/abc/comments/"]["status"], 500)
+        self.assertEqual(responses[f"/api/posts/{pid}/"]["body"]["body"], "Still here")
+        self.assertEqual(responses["/api/posts/"]["status"], 200)
+
+    def test_archived_posts_remain_readable(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Ancient"}, format="json", **headers
+        ).data["id"]
+        self.client.post(
+            f"/api/posts/{pid}/comments/",
+            {"body": "Old news"},
+            format="json",
+            **headers,
+        )
+        self.client.post(f"/api/posts/{pid}/like/", **self.auth_headers("bob"))
+        old = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk=pid).update(created_at=old)
+        recent = self.client.post(
+            "/api/posts/", {"body": "Fresh"}, format="json", **headers
+        ).data["id"]
+        self.client.post(
+            f"/api/posts/{recent}/comments/", {"body": "New"}, format="json", **headers
+        )
+        # A live post's comments cost the count and the page, no archive lookup
+        with self.assertNumQueries(2):
+            live = self.client.get(f"/api/posts/{recent}/comments/")
+        self.assertEqual(live.data["count"], 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command(
+                "archive_posts", older_than_days=365, export_dir=tmp, stdout=StringIO()
+            )
+            exported = list(Path(tmp).glob("posts-*.ndjson.gz"))
+            self.assertEqual(len(exported), 1)
+            with gzip.open(exported[0], "rt") as fh:
+                self.assertEqual(json.loads(fh.readline())["id"], pid)
+        self.assertFalse(Post.objects.filter(pk=pid).exists())
+        self.assertTrue(Post.objects.filter(pk=recent).exists())
+        r = self.client.get(f"/api/posts/{pid}/")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.data["archived"])
+        self.assertEqual(r.data["body"], "Ancient")
+        self.assertEqual(r.data["likes_count"], 1)
+        self.assertEqual(r.data["comments_count"], 1)
+        self.assertEqual(
+            set(r.data["author"]),
+            {"id", "username", "followers_count", "following_count"},
+        )
+        comments = self.client.get(f"/api/posts/{pid}/comments/")
+        self.assertEqual(comments.status_code, 200)
+        self.assertEqual(comments.data["count"], 1)
+        archived_comment = comments.data["results"][0]
+        self.assertEqual(archived_comment["body"], "Old news")
+        self.assertEqual(archived_comment["author"]["username"], "alice")
+        self.assertEqual(archived_comment["post"], pid)
+        one = self.client.get(f"/api/posts/{pid}/comments/{archived_comment['id']}/")
+        self.assertEqual(one.data["body"], "Old news")
+        listed = self.client.get("/api/posts/").data["results"]
+        self.assertNotIn(pid, [p["id"] for p in listed])
+        self.assertEqual(self.client.get("/api/posts/999999/").status_code, 404)
+
+    def test_partition_month_ranges(self):
+        start = datetime(2024, 11, 15, tzinfo=dt_timezone.utc)
+        end = partitioning.add_months(start, 3)
+        months = list(partitioning.month_range(start, end))
+        self.assertEqual(
+            [partitioning.partition_name("social_comment", m) for m in months],
+            [
+                "social_comment_p202411",
+                "social_comment_p202412",
+                "social_comment_p202501",
+                "social_comment_p202502",
+            ],
+        )
+        out = StringIO()
+        call_command("manage_partitions", stdout=out)
+        if connection.vendor != "postgresql":
+            self.assertIn("skipping", out.getvalue())
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+    def test_partitions_adopt_rows_stranded_in_default(self):
+        now = timezone.now()
+        table = Comment._meta.db_table
+        post = Post.objects.create(author=self.user1, body="Partitioned")
+        Comment.objects.create(author=self.user2, post=post, body="now")
+        partitioning.convert_to_partitioned(connection, Comment, now, 1)
+        self.assertTrue(partitioning.is_partitioned(connection, table))
+
+        # The cron was missed: a comment lands beyond the last partition
+        later = partitioning.add_months(partitioning.month_start(now), 4)
+        stray = Comment.objects.create(author=self.user2, post=post, body="later")
+        Comment.objects.filter(pk=stray.pk).update(created_at=later)
+
+        def partition_of(comment_id):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT tableoid::regclass::text FROM {table} WHERE id = %s",
+                    [comment_id],
+                )
+                return cursor.fetchone()[0]
+
+        self.assertEqual(
+            partition_of(stray.pk), partitioning.default_partition_name(table)
+        )
+        created = partitioning.ensure_partitions(connection, table, now, 6)
+        expected = partitioning.partition_name(table, later)
+        self.assertIn(expected, created)
+        self.assertEqual(partition_of(stray.pk), expected)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        # Idempotent once the partitions exist
+        self.assertEqual(
+            partitioning.ensure_partitions(connection, table, now, 6), created
+        )
+
+    def test_profiling_opt_in_for_staff(self):
+        headers = self.auth_headers()
+        self.client.post("/api/posts/", {"body": "Profiled"}, format="json", **headers)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            PROFILING_REPORT_DIR=tmp, PROFILING_MAX_REPORTS=2
+        ), mock.patch("cProfile.Profile.enable") as enable:
+            r = self.client.get("/api/posts/", HTTP_X_PROFILE="explain", **headers)
+            self.assertNotIn("Server-Timing", r)  # alice is not staff
+            r = self.client.get("/api/posts/", HTTP_X_PROFILE="1")  # anonymous
+            self.assertNotIn("Server-Timing", r)
+            enable.assert_not_called()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            PROFILING_REPORT_DIR=tmp, PROFILING_MAX_REPORTS=2
+        ):
+            self.user1.is_staff = True
+            self.user1.save()
+            r = self.client.get("/api/posts/", HTTP_X_PROFILE="explain", **headers)
+            self.assertEqual(r.status_code, 200)
+            self.assertIn("db;dur=", r["Server-Timing"])
+            self.assertIn("serializer;dur=", r["Server-Timing"])
+            report = Path(tmp) / r["X-Profile-Report"]
+            self.assertTrue((report / "profile.prof").exists())
+            self.assertTrue((report / "report.html").exists())
+            data = json.loads((report / "report.json").read_text())
+            self.assertTrue(data["queries"])
+            self.assertTrue(any("explain" in q for q in data["queries"]))
+            # Not profiled without opt-in
+            self.assertNotIn("Server-Timing", self.client.get("/api/posts/"))
+            # Sampled requests only write a report: no timings or report ids
+            # for the client, and no SQL parameters (e.g. password hashes)
+            before = set(Path(tmp).iterdir())
+            with override_settings(PROFILING_SAMPLE_RATE=1.0):
+                r = self.client.post(
+                    "/api/auth/register/",
+                    {"username": "dave", "password": "password123"},
+                    format="json",
+                )
+            self.assertNotIn("Server-Timing", r)
+            self.assertNotIn("X-Profile-Report", r)
+            (report,) = set(Path(tmp).iterdir()) - before
+            data = json.loads((report / "report.json").read_text())
+            self.assertTrue(data["queries"])
+            self.assertTrue(all(q["params"] is None for q in data["queries"]))
+            # Only the newest PROFILING_MAX_REPORTS are kept
+            for _ in range(2):
+                self.client.get("/api/posts/", HTTP_X_PROFILE="1", **headers)
+            self.assertEqual(len([p for p in Path(tmp).iterdir() if p.is_dir()]), 2)
+
+    def test_stored_openapi_schema_is_current(self):
+        # Fails when the API changed without `python manage.py build_schema`
+        call_command("build_schema", check=True, stdout=StringIO())
+
+    def test_delete_post_hides_then_removes_in_batches(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Short-lived"}, format="json", **headers
+        ).data["id"]
+        headers_bob = self.auth_headers("bob")
+        self.client.post(f"/api/posts/{pid}/like/", **headers_bob)
+        for i in range(3):
+            self.client.post(
+                f"/api/posts/{pid}/comments/",
+                {"body": f"c{i}"},
+                format="json",
+                **headers_bob,
+            )
+        with override_settings(DELETION_BATCH_SIZE=1, DELETION_INLINE_BATCHES=2):
+            r = self.client.delete(f"/api/posts/{pid}/", **headers)
+        self.assertEqual(r.status_code, 204)
+        # Gone from the API immediately, rows still being removed
+        self.assertEqual(self.client.get(f"/api/posts/{pid}/").status_code, 404)
+        comments = self.client.get(f"/api/posts/{pid}/comments/")
+        self.assertEqual(comments.data["count"], 0)
+        self.assertTrue(Post.objects.filter(pk=pid, is_hidden=True).exists())
+        job = DeletionJob.objects.get(kind=DeletionJob.KIND_POST, target_id=pid)
+        self.assertEqual(job.status, DeletionJob.STATUS_PENDING)
+
+        call_command("process_deletions", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.STATUS_DONE)
+        self.assertFalse(Post.objects.filter(pk=pid).exists())
+        self.assertFalse(Comment.objects.filter(post_id=pid).exists())
+        self.assertFalse(Notification.objects.filter(post_id=pid).exists())
+
+    def test_deleted_post_is_not_archived_or_served_from_archive(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Regretted"}, format="json", **headers
+        ).data["id"]
+        old = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk=pid).update(created_at=old)
+        with override_settings(DELETION_INLINE_BATCHES=0):
+            r = self.client.delete(f"/api/posts/{pid}/", **headers)
+        self.assertEqual(r.status_code, 204)
+        call_command("archive_posts", older_than_days=365, stdout=StringIO())
+        self.assertFalse(ArchivedPost.objects.filter(pk=pid).exists())
+        self.assertEqual(self.client.get(f"/api/posts/{pid}/").status_code, 404)
+
+        # An archived copy made before the deletion request is removed too
+        ArchivedPost.objects.create(
+            id=pid, author=self.user1, created_at=timezone.now(), payload=b""
+        )
+        call_command("process_deletions", stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=pid).exists())
+        self.assertFalse(ArchivedPost.objects.filter(pk=pid).exists())
+
+    def test_delete_account_is_immediate_and_resumable(self):
+        headers_alice = self.auth_headers()
+        headers_bob = self.auth_headers("bob")
+        alice_pid = self.client.post(
+            "/api/posts/", {"body": "mine"}, format="json", **headers_alice
+        ).data["id"]
+        bob_pids = [
+            self.client.post(
+                "/api/posts/", {"body": f"bob {i}"}, format="json", **headers_bob
+            ).data["id"]
+            for i in range(3)
+        ]
+        for pid in bob_pids:
+            self.client.post(f"/api/posts/{pid}/like/", **headers_alice)
+            self.client.post(
+                f"/api/posts/{pid}/comments/",
+                {"body": "hi"},
+                format="json",
+                **headers_alice,
+            )
+        self.client.post(f"/api/posts/{alice_pid}/like/", **headers_bob)
+        self.client.post(f"/api/users/{self.user2.id}/follow/", **headers_alice)
+        self.client.post(f"/api/users/{self.user1.id}/follow/", **headers_bob)
+
+        with override_settings(DELETION_BATCH_SIZE=2, DELETION_INLINE_BATCHES=1):
+            r = self.client.delete("/api/users/me/", **headers_alice)
+        self.assertEqual(r.status_code, 202)
+        job = DeletionJob.objects.get(pk=r.data["job"])
+        self.assertEqual(job.status, DeletionJob.STATUS_PENDING)
+        # Hidden right away even though most rows still exist
+        profile = self.client.get(f"/api/users/{self.user1.id}/")
+        self.assertEqual(profile.status_code, 404)
+        self.assertEqual(self.client.get(f"/api/posts/{alice_pid}/").status_code, 404)
+        self.assertEqual(
+            self.client.get(f"/api/posts/{bob_pids[0]}/comments/").data["count"], 0
+        )
+        r = self.client.post(f"/api/users/{self.user1.id}/follow/", **headers_bob)
+        self.assertEqual(r.status_code, 404)
+
+        # Simulate a worker that died mid-job; a fresh run resumes from `step`
+        DeletionJob.objects.filter(pk=job.pk).update(
+            status=DeletionJob.STATUS_RUNNING,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        call_command("process_deletions", batch_size=2, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.STATUS_DONE)
+        self.assertFalse(User.objects.filter(pk=self.user1.id).exists())
+        self.assertFalse(Post.objects.filter(pk=alice_pid).exists())
+        self.assertFalse(Comment.objects.filter(author_id=self.user1.id).exists())
+        self.assertFalse(Like.objects.filter(user_id=self.user1.id).exists())
+        self.assertFalse(Follow.objects.filter(following_id=self.user1.id).exists())
+        self.assertFalse(
+            Notification.objects.filter(actors__actor_id=self.user1.id).exists()
+        )
+        for pid in bob_pids:
+            self.assertEqual(Post.objects.get(pk=pid).likes_total, 0)
+
+    def test_deletions_keep_unread_counts_and_drop_empty_groups(self):
+        headers_alice = self.auth_headers()
+        headers_bob = self.auth_headers("bob")
+        User.objects.create_user(username="carol", password="password123")
+        shared, bobs_only = (
+            self.client.post(
+                "/api/posts/", {"body": body}, format="json", **headers_alice
+            ).data["id"]
+            for body in ("shared", "bob's only")
+        )
+        self.client.post(f"/api/posts/{shared}/like/", **headers_bob)
+        self.client.post(f"/api/posts/{shared}/like/", **self.auth_headers("carol"))
+        self.client.post(f"/api/posts/{bobs_only}/like/", **headers_bob)
+        self.client.post(f"/api/users/{self.user1.id}/follow/", **headers_bob)
+        unread = self.client.get("/api/notifications/unread-count/", **headers_alice)
+        self.assertEqual(unread.data["unread"], 3)
+
+        self.client.delete("/api/users/me/", **headers_bob)
+        call_command("process_deletions", stdout=StringIO())
+        r = self.client.get("/api/notifications/", **headers_alice)
+        self.assertEqual(
+            [n["summary"] for n in r.data["results"]], ["carol liked your post"]
+        )
+        unread = self.client.get("/api/notifications/unread-count/", **headers_alice)
+        self.assertEqual(unread.data["unread"], 1)
+
+        # Read groups do not count against the total when their post goes
+        self.client.post("/api/notifications/mark-read/", **headers_alice)
+        self.client.post(
+            f"/api/users/{self.user1.id}/follow/", **self.auth_headers("carol")
+        )
+        self.client.delete(f"/api/posts/{shared}/", **headers_alice)
+        call_command("process_deletions", stdout=StringIO())
+        self.assertFalse(Notification.objects.filter(post_id=shared).exists())
+        unread = self.client.get("/api/notifications/unread-count/", **headers_alice)
+        self.assertEqual(unread.data["unread"], 1)
+
+    def test_notifications_coalesce_and_mark_read(self):
+        headers_alice = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Popular"}, format="json", **headers_alice
+        ).data["id"]
+        carol = User.objects.create_user(username="carol", password="password123")
+        for username in ("bob", carol.username):
+            self.client.post(f"/api/posts/{pid}/like/", **self.auth_headers(username))
+        # Own like and repeated like do not notify
+        self.client.post(f"/api/posts/{pid}/like/", **headers_alice)
+        self.client.post(f"/api/posts/{pid}/like/", **self.auth_headers("bob"))
+        self.client.post(
+            f"/api/users/{self.user1.id}/follow/", **self.auth_headers("bob")
+        )
+
+        r = self.client.get("/api/notifications/", **headers_alice)
+        self.assertEqual(r.status_code, 200)
+        by_verb = {n["verb"]: n for n in r.data["results"]}
+        self.assertEqual(len(r.data["results"]), 2)
+        self.assertEqual(by_verb["like"]["event_count"], 2)
+        self.assertEqual(by_verb["like"]["actor_count"], 2)
+        self.assertEqual(
+            by_verb["like"]["summary"], "carol and 1 other liked your post"
+        )
+        self.assertTrue(by_verb["like"]["unread"])
+        count = self.client.get("/api/notifications/unread-count/", **headers_alice)
+        self.assertEqual(count.data["unread"], 2)
+
+        r2 = self.client.post("/api/notifications/mark-read/", **headers_alice)
+        self.assertEqual(r2.status_code, 200)
+        r3 = self.client.get("/api/notifications/", **headers_alice)
+        self.assertFalse(any(n["unread"] for n in r3.data["results"]))
+        # New activity on a read group re-opens it
+        self.client.post(
+            f"/api/posts/{pid}/comments/",
+            {"body": "Nice"},
+            format="json",
+            **self.auth_headers("bob"),
+        )
+        for _ in range(3):
+            self.client.post(f"/api/posts/{pid}/unlike/", **self.auth_headers("bob"))
+            self.client.post(f"/api/posts/{pid}/like/", **self.auth_headers("bob"))
+        count = self.client.get("/api/notifications/unread-count/", **headers_alice)
+        self.assertEqual(count.data["unread"], 2)
+        # Repeat events by the same person are not counted as other people
+        r4 = self.client.get("/api/notifications/", **headers_alice)
+        like = next(n for n in r4.data["results"] if n["verb"] == "like")
+        self.assertEqual(like["event_count"], 5)
+        self.assertEqual(like["actor_count"], 2)
+        self.assertEqual(like["summary"], "bob and 1 other liked your post")
+
+    @override_settings(NOTIFICATION_MAX_ACTORS=2)
+    def test_notification_actor_tracking_is_capped(self):
+        post = Post.objects.create(author=self.user1, body="Viral")
+        fans = [
+            User.objects.create_user(username=f"fan{i}", password="password123")
+            for i in range(4)
+        ]
+        for fan in fans[:3]:
+            notifications.notify(self.user1.id, Notification.VERB_LIKE, fan, post=post)
+        group = Notification.objects.get(post=post)
+        self.assertEqual(group.actor_count, 2)
+        self.assertEqual(group.actors.count(), 2)
+        # Past the cap an event is the watermark read and one UPDATE, nothing else
+        with self.assertNumQueries(3):
+            notifications.notify(
+                self.user1.id, Notification.VERB_LIKE, fans[3], post=post
+            )
+        r = self.client.get("/api/notifications/", **self.auth_headers())
+        self.assertEqual(r.data["results"][0]["event_count"], 4)
+        self.assertEqual(
+            r.data["results"][0]["summary"], "fan3 and 1+ others liked your post"
+        )
+
+    def test_redis_broker_listener_survives_disconnects(self):
+        prefix = events.RedisBroker.prefix
+
+        class FakePubSub:
+            def __init__(self, items):
+                self.items = items
+
+            def psubscribe(self, pattern):
+                pass
+
+            def listen(self):
+                for item in self.items:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+
+            def close(self):
+                pass
+
+        sessions = [
+            [ConnectionError("reset by peer")],
+            [
+                {"channel": f"{prefix}post:1".encode(), "data": b"not json"},
+                {"channel": f"{prefix}post:1".encode(), "data": b'{"type": "x"}'},
+            ],
+        ]
+
+        class FakeClient:
+            def pubsub(self, **kwargs):
+                return FakePubSub(sessions.pop(0))
+
+        broker = events.RedisBroker.__new__(events.RedisBroker)
+        broker.client = FakeClient()
+        broker.backoff = 0
+        delivered = []
+        stop = threading.Event()
+
+        def deliver(channel, message):
+            delivered.append((channel, message))
+            stop.set()
+
+        with self.assertLogs("social.events", "WARNING"):
+            broker.run(deliver, stop)
+        self.assertEqual(delivered, [("post:1", {"type": "x"})])
+
+    def test_sse_stream_pushes_count_changes(self):
+        headers = self.auth_headers()
+        pid = self.client.post(
+            "/api/posts/", {"body": "Live"}, format="json", **headers
+        ).data["id"]
+        token = headers["HTTP_AUTHORIZATION"].split()[1]
+        headers_bob = self.auth_headers("bob")
+
+        def like_as_bob():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f"/api/posts/{pid}/like/", **headers_bob)
+
+        async def run():
+            inbox = asyncio.Queue()
+            sent = asyncio.Queue()
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": "/api/stream/",
+                "query_string": f"token={token}&posts={pid}".encode(),
+                "headers": [],
+            }
+            task = asyncio.ensure_future(application(scope, inbox.get, sent.put))
+            start = await asyncio.wait_for(sent.get(), 5)
+            self.assertEqual(start["status"], 200)
+            await asyncio.wait_for(sent.get(), 5)  # retry hint
+            await sync_to_async(like_as_bob)()
+            event = await asyncio.wait_for(sent.get(), 5)
+            await inbox.put({"type": "http.disconnect"})
+            await asyncio.wait_for(task, 5)
+            return event["body"].decode()
+
+        body = async_to_sync(run)()
+        self.assertIn("event: post.counts", body)
+        self.assertIn('"likes_delta": 1', body)
+
+        async def unauthenticated():
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {"type": "http", "method": "GET", "path": "/api/stream/"}
+            await application(scope, asyncio.Queue().get, send)
+            return sent[0]["status"]
+
+        self.assertEqual(async_to_sync(unauthenticated)(), 401)
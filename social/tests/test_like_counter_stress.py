@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from social import counters
+from social.models import Like, Post
+
+User = get_user_model()
+
+THREADS = 8
+LIKES_PER_THREAD = 25
+
+
+@contextmanager
+def count_post_updates(counts):
+    """Count UPDATEs of the post table issued on this thread's connection."""
+    prefix = f"UPDATE {connection.ops.quote_name(Post._meta.db_table)}"
+
+    def wrapper(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if sql.startswith(prefix):
+            counts.append(1)
+        return result
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+class LikeCounterStressTests(TransactionTestCase):
+    """Many users liking one hot post through the API, buffered vs unbuffered."""
+
+    def setUp(self):
+        author = User.objects.create_user(username="author", password="password123")
+        self.posts = [
+            Post.objects.create(author=author, body="Viral"),
+            Post.objects.create(author=author, body="Also viral"),
+        ]
+        User.objects.bulk_create(
+            User(username=f"fan{i}") for i in range(THREADS * LIKES_PER_THREAD)
+        )
+        self.fans = list(User.objects.filter(username__startswith="fan"))
+        self.addCleanup(counters.reset_buffer, flush=False)
+
+    def hammer(self, post):
+        """Like ``post`` once per fan; returns the number of post-row UPDATEs."""
+        updates, statuses = [], []
+        start = threading.Barrier(THREADS)
+
+        def worker(fans):
+            client = APIClient()
+            start.wait()
+            try:
+                with count_post_updates(updates):
+                    for fan in fans:
+                        client.force_authenticate(fan)
+                        while True:
+                            try:
+                                r = client.post(f"/api/posts/{post.id}/like/")
+                                break
+                            except OperationalError:  # SQLite table lock
+                                time.sleep(0.001)
+                        statuses.append(r.status_code)
+            finally:
+                close_old_connections()
+
+        threads = [
+            threading.Thread(target=worker, args=(self.fans[i::THREADS],))
+            for i in range(THREADS)
+        ]
+        # Lock errors surface as 500s before the retry; don't log each one.
+        request_logger = logging.getLogger("django.request")
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            request_logger.setLevel(previous_level)
+        self.assertEqual(statuses, [200] * len(self.fans))
+        return len(updates)
+
+    def test_buffered_counter_takes_hot_row_out_of_the_request_path(self):
+        total = THREADS * LIKES_PER_THREAD
+        direct_post, buffered_post = self.posts
+
+        with override_settings(LIKE_COUNTER_BUFFERED=False):
+            direct_updates = self.hammer(direct_post)
+        direct_post.refresh_from_db()
+        self.assertEqual(direct_post.likes_total, total)
+        # One hot-row UPDATE per like (more if a locked attempt was retried)
+        self.assertGreaterEqual(direct_updates, total)
+
+        with override_settings(
+            LIKE_COUNTER_BUFFERED=True,
+            LIKE_COUNTER_FLUSH_THRESHOLD=10**9,
+            LIKE_COUNTER_FLUSH_SECONDS=3600,
+        ):
+            counters.reset_buffer(flush=False)
+            buffered_updates = self.hammer(buffered_post)
+            self.assertEqual(buffered_updates, 0)
+            buffered_post.refresh_from_db()
+            self.assertEqual(buffered_post.likes_total, 0)
+            # Reads combine the persisted value with pending deltas
+            self.assertEqual(counters.likes_count(buffered_post), total)
+            flush_updates = []
+            with count_post_updates(flush_updates):
+                counters.get_buffer().flush()
+        self.assertEqual(len(flush_updates), 1)
+        buffered_post.refresh_from_db()
+        self.assertEqual(buffered_post.likes_total, total)
+        self.assertEqual(Like.objects.filter(post=buffered_post).count(), total)
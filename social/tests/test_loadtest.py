@@ -0,0 +1,52 @@
+import json
+import random
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from social import loadtest
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def run_loadtest(self, app):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "report.json"
+            call_command(
+                "loadtest",
+                app=app,
+                threads=1,
+                requests=30,
+                duration=60,
+                users=6,
+                posts=20,
+                mix="feed=3,posts=3,like=2,comment=1,follow=1,register=1",
+                json_path=str(out),
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            return json.loads(out.read_text())
+
+    def test_wsgi_and_asgi_reports(self):
+        for app in ("wsgi", "asgi"):
+            with self.subTest(app=app):
+                report = self.run_loadtest(app)
+                self.assertEqual(report["requests"], 30)
+                self.assertEqual(report["errors"], 0)
+                self.assertEqual(sum(report["histogram"].values()), 30)
+                self.assertIn("feed", report["operations"])
+                self.assertIn("locked_errors", report["db_locks"])
+                # The mix writes, so both paths must see their DB connections
+                self.assertGreater(report["db_locks"]["write_seconds"], 0)
+
+    def test_zipf_sampler_skews_towards_first_ranks(self):
+        sampler = loadtest.ZipfSampler(range(100), 1.2, random.Random(1))
+        draws = [sampler.sample() for _ in range(5000)]
+        self.assertGreater(draws.count(0), draws.count(50) * 20)
+
+    def test_parse_mix_rejects_unknown_operations(self):
+        self.assertEqual(loadtest.parse_mix("feed=2,like"), {"feed": 2.0, "like": 1.0})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("delete=1")
@@ -2,11 +2,21 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedDefaultRouter
 
-from .views import PostViewSet, CommentViewSet, FollowView, RegisterView, UserPublicViewSet
+from .views import (
+    PostViewSet,
+    CommentViewSet,
+    FollowView,
+    RegisterView,
+    UserPublicViewSet,
+    NotificationViewSet,
+    BatchView,
+    UsernameAvailabilityView,
+)
 
 router = DefaultRouter()
 router.register("posts", PostViewSet, basename="post")
 router.register("users", UserPublicViewSet, basename="user")
+router.register("notifications", NotificationViewSet, basename="notification")
 
 posts_router = NestedDefaultRouter(router, "posts", lookup="post")
 posts_router.register("comments", CommentViewSet, basename="post-comments")
@@ -16,4 +26,10 @@ urlpatterns = [
     path("", include(posts_router.urls)),
     path("users/<int:user_id>/follow/", FollowView.as_view(), name="user-follow"),
     path("auth/register/", RegisterView.as_view(), name="auth-register"),
+    path(
+        "auth/username-available/",
+        UsernameAvailabilityView.as_view(),
+        name="auth-username-available",
+    ),
+    path("batch/", BatchView.as_view(), name="batch"),
 ]
@@ -1,8 +1,16 @@
+import logging
+from urllib.parse import urlsplit
+
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, Value
+from django.db.models.functions import Lower
+from django.http import Http404, HttpRequest, QueryDict
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets, status
+from django.urls import Resolver404, resolve
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
     IsAuthenticated,
@@ -10,9 +18,11 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 from rest_framework.generics import CreateAPIView, GenericAPIView
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 
-from .models import Post, Comment, Like, Follow
+from . import archive, counters, deletion, events, notifications
+from .models import Post, Comment, Like, Follow, Notification
 from .permissions import IsOwnerOrReadOnly
 from .serializers import (
     PostSerializer,
@@ -20,8 +30,13 @@ from .serializers import (
     RegisterSerializer,
     FollowSerializer,
     UserPublicSerializer,
+    NotificationSerializer,
+    BatchRequestSerializer,
+    UsernameAvailabilitySerializer,
 )
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 
@@ -30,10 +45,37 @@ class RegisterView(CreateAPIView):
     permission_classes = [AllowAny]
 
 
+@extend_schema(
+    parameters=[OpenApiParameter("username", str, required=True)],
+    responses=UsernameAvailabilitySerializer,
+)
+class UsernameAvailabilityView(GenericAPIView):
+    """Live signup validation: is this username (case-insensitively) free?"""
+
+    serializer_class = UsernameAvailabilitySerializer
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        username = request.query_params.get("username", "").strip()
+        if not username:
+            return Response({"detail": "username is required."}, status=400)
+        # Matches the LOWER(username) unique index; `iexact` would not use it.
+        # Lower the input in SQL too: Python's lower() disagrees with the
+        # database's LOWER() outside ASCII.
+        taken = (
+            User.objects.annotate(username_lower=Lower("username"))
+            .filter(username_lower=Lower(Value(username)))
+            .exists()
+        )
+        data = self.get_serializer({"username": username, "available": not taken}).data
+        return Response(data)
+
+
 class UserPublicViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UserPublicSerializer
     queryset = (
-        User.objects.all()
+        User.objects.filter(is_active=True)
         .annotate(
             followers_count=Count("followers", distinct=True),
             following_count=Count("following", distinct=True),
@@ -41,6 +83,27 @@ class UserPublicViewSet(viewsets.ReadOnlyModelViewSet):
         .order_by("id")
     )
 
+    @extend_schema(
+        summary="Delete my account",
+        description=(
+            "Deactivates the account immediately and removes its posts, "
+            "comments, likes and follows in the background."
+        ),
+        request=None,
+        responses={202: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["delete"],
+        permission_classes=[IsAuthenticated],
+        url_path="me",
+    )
+    def me(self, request):
+        job = deletion.request_user_deletion(request.user)
+        return Response(
+            {"job": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED
+        )
+
 
 class PostViewSet(viewsets.ModelViewSet):
     serializer_class = PostSerializer
@@ -48,27 +111,54 @@ class PostViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return (
-            Post.objects.select_related("author")
-            .annotate(
-                likes_count=Count("likes", distinct=True),
-                comments_count=Count("comments", distinct=True),
-            )
+            Post.objects.filter(is_hidden=False, author__is_active=True)
+            .select_related("author")
+            .annotate(comments_count=Count("comments", distinct=True))
             .order_by("-created_at")
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Old posts live in cold storage; serve them read-only from there.
+            pk = str(kwargs.get("pk", ""))
+            data = archive.load_archived_post(int(pk)) if pk.isdigit() else None
+            if data is None:
+                raise
+            return Response(data)
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        events.post_created(post)
+
+    def perform_destroy(self, instance):
+        # Hidden at once; likes/comments go in batches instead of one CASCADE.
+        deletion.request_post_deletion(instance)
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         post = self.get_object()
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=request.user, post=post)
+            if created:
+                counters.apply_like_delta(post.id, 1)
+        if created:
+            notifications.notify(
+                post.author_id, Notification.VERB_LIKE, request.user, post=post
+            )
+            events.post_counts_changed(post.id, likes=1)
         return Response({"detail": "liked" if created else "already liked"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated], url_path="unlike")
     def unlike(self, request, pk=None):
         post = self.get_object()
-        Like.objects.filter(user=request.user, post=post).delete()
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(user=request.user, post=post).delete()
+            if deleted:
+                counters.apply_like_delta(post.id, -1)
+        if deleted:
+            events.post_counts_changed(post.id, likes=-1)
         return Response({"detail": "unliked"}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="feed")
@@ -92,12 +182,59 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.select_related("author", "post")
 
     def get_queryset(self):  # type: ignore[override]
-        return self.queryset.filter(post_id=self.kwargs["post_pk"]).select_related(
-            "author", "post"
-        )
+        return self.queryset.filter(
+            post_id=self.kwargs["post_pk"],
+            post__is_hidden=False,
+            author__is_active=True,
+        ).select_related("author", "post")
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        live = response.data["results"] if self.paginator else response.data
+        # Only an empty live list can belong to an archived post.
+        comments = None if live else self._archived_comments()
+        if comments is None:
+            return response
+        page = self.paginate_queryset(comments)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(comments)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pk = str(kwargs.get("pk", ""))
+            for comment in self._archived_comments() or []:
+                if str(comment["id"]) == pk:
+                    return Response(comment)
+            raise
+
+    def _archived_comments(self):
+        """Comments of an archived post (read-only), or ``None`` if not archived."""
+        post_pk = str(self.kwargs["post_pk"])
+        if not post_pk.isdigit():
+            return None
+        payload = archive.load_archived_post(int(post_pk), with_comments=True)
+        return None if payload is None else payload["comments"]
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, post_id=self.kwargs["post_pk"])
+        post = get_object_or_404(
+            Post, pk=self.kwargs["post_pk"], is_hidden=False, author__is_active=True
+        )
+        comment = serializer.save(author=self.request.user, post=post)
+        notifications.notify(
+            comment.post.author_id,
+            Notification.VERB_COMMENT,
+            self.request.user,
+            post=comment.post,
+        )
+        events.post_counts_changed(comment.post_id, comments=1)
+
+    def perform_destroy(self, instance):
+        post_id = instance.post_id
+        instance.delete()
+        events.post_counts_changed(post_id, comments=-1)
 
 
 @extend_schema_view(
@@ -113,10 +250,12 @@ class FollowView(GenericAPIView):
     def post(self, request, user_id: int):  # type: ignore[override]
         if request.user.id == user_id:
             return Response({"detail": "Cannot follow self."}, status=400)
-        target = get_object_or_404(User, pk=user_id)
+        target = get_object_or_404(User, pk=user_id, is_active=True)
         obj, created = Follow.objects.get_or_create(
             follower=request.user, following=target
         )
+        if created:
+            notifications.notify(target.id, Notification.VERB_FOLLOW, request.user)
         data = self.get_serializer(obj).data
         return Response(
             data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
@@ -125,3 +264,111 @@ class FollowView(GenericAPIView):
     def delete(self, request, user_id: int):  # type: ignore[override]
         Follow.objects.filter(follower=request.user, following_id=user_id).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class NotificationCursorPagination(CursorPagination):
+    ordering = ("-updated_at", "-id")
+    page_size = 20
+
+
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Aggregated notifications for the current user, newest activity first."""
+
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
+    # Base queryset for schema generation; actual filtering in get_queryset
+    queryset = Notification.objects.select_related("last_actor")
+
+    def get_queryset(self):  # type: ignore[override]
+        if getattr(self, "swagger_fake_view", False):
+            return self.queryset.none()
+        return self.queryset.filter(recipient=self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.user.is_authenticated:
+            counter = notifications.get_counter(self.request.user.id)
+            context["last_read_at"] = counter.last_read_at
+        return context
+
+    @action(detail=False, methods=["get"], url_path="unread-count")
+    def unread_count(self, request):
+        counter = notifications.get_counter(request.user.id)
+        return Response({"unread": counter.unread})
+
+    @action(detail=False, methods=["post"], url_path="mark-read")
+    def mark_read(self, request):
+        notifications.mark_all_read(request.user.id)
+        return Response({"unread": 0}, status=status.HTTP_200_OK)
+
+
+def _sub_error(status_code, detail):
+    return {"status": status_code, "body": {"detail": detail}}
+
+
+class BatchView(GenericAPIView):
+    """Run several GET requests against the API in one round-trip.
+
+    Sub-requests are resolved through ``social.urls`` and dispatched straight
+    to their views, skipping the middleware stack and reusing the user
+    authenticated for the batch request itself (and the same DB connection).
+    Repeated paths are executed once, and an entry that fails only reports
+    its own error.
+    """
+
+    serializer_class = BatchRequestSerializer
+    permission_classes = [AllowAny]
+    prefix = "/api/"
+
+    @extend_schema(
+        summary="Batch GET requests",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = {}
+        for raw in serializer.validated_data["requests"]:
+            path = raw.strip()
+            if path not in responses:
+                responses[path] = self.dispatch_sub_request(request, path)
+        return Response({"responses": responses})
+
+    def dispatch_sub_request(self, request, path):
+        parts = urlsplit(path)
+        if parts.scheme or parts.netloc or not parts.path.startswith(self.prefix):
+            return _sub_error(400, f"Path must start with {self.prefix}")
+        try:
+            match = resolve(parts.path[len(self.prefix) - 1 :], urlconf="social.urls")
+        except Resolver404:
+            return _sub_error(404, "Not found.")
+        if getattr(match.func, "view_class", None) is BatchView:
+            return _sub_error(400, "Nested batches are not allowed.")
+
+        sub = HttpRequest()
+        sub.method = "GET"
+        sub.path = sub.path_info = parts.path
+        sub.META = {
+            **request._request.META,
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+        }
+        sub.GET = QueryDict(parts.query)
+        sub.COOKIES = request._request.COOKIES
+        sub.resolver_match = match
+        if request.user.is_authenticated:
+            # Same hook DRF's test client uses to skip re-authentication.
+            sub._force_auth_user = request.user
+            sub._force_auth_token = request.auth
+
+        try:
+            response = match.func(sub, *match.args, **match.kwargs)
+        except Exception:
+            # DRF only handles its own exceptions; keep one broken entry from
+            # failing the rest of the batch.
+            logger.exception("Batch sub-request %s failed", path)
+            return _sub_error(500, "Internal server error.")
+        body = getattr(response, "data", None)
+        return {"status": response.status_code, "body": body}